@@ -0,0 +1,53 @@
+"""
+Dashboard API route combining the reads the frontend pages need
+"""
+import logging
+from fastapi import APIRouter, Query
+
+from app.schemas.dashboard import DashboardResponse
+from app.dependencies import (
+    CurrentUserDep, CurrentTenantDep, DatabaseDep, DocumentServiceDep
+)
+from app.api.documents import list_documents
+from app.api.queries import get_query_history, get_query_history_stats
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+
+@router.get("", response_model=DashboardResponse)
+async def get_dashboard(
+    current_user: CurrentUserDep,
+    current_tenant: CurrentTenantDep,
+    db: DatabaseDep,
+    document_service: DocumentServiceDep,
+    document_limit: int = Query(default=20, ge=1, le=100),
+    history_limit: int = Query(default=20, ge=1, le=100),
+    preview_chars: int = Query(default=500, ge=1)
+):
+    """
+    Get tenant info, the first page of documents, the first page of
+    query history and its statistics in one round trip
+    
+    Reuses the individual route handlers with the already-resolved
+    user, tenant and database session. History response texts are cut
+    to preview_chars.
+    """
+    documents = await list_documents(
+        current_user, current_tenant, db, document_service,
+        skip=0, limit=document_limit
+    )
+    history = await get_query_history(
+        current_user, current_tenant, db,
+        skip=0, limit=history_limit, preview_chars=preview_chars
+    )
+    
+    history_stats = await get_query_history_stats(current_user, current_tenant, db)
+    
+    return DashboardResponse(
+        tenant=current_tenant,
+        documents=documents,
+        history=history,
+        history_stats=history_stats
+    )
@@ -315,7 +315,7 @@ async def search_documents(
         embedding_service = EmbeddingService()
         
         # Generate query embedding
-        query_embedding = await embedding_service.embed_text(search_request.query)
+        query_embedding = await embedding_service.embed_query(search_request.query)
         
         # Build filter conditions
         filter_conditions = {}
@@ -1,29 +1,65 @@
 """
 Query and RAG API routes
 """
+import asyncio
 import logging
 import time
-from typing import List, Optional
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from uuid import UUID
 from fastapi import APIRouter, HTTPException, status, BackgroundTasks
 from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
 from uuid import uuid4
 
 from app.schemas.query import (
     QueryRequest, QueryResponse, QueryHistory, QueryFeedback,
-    RAGRequest, RAGResponse, ContextDocument, QueryAnalytics
+    RAGRequest, RAGResponse, ContextDocument, QueryAnalytics, QueryHistoryStats
 )
 from app.dependencies import (
     CurrentUserDep, CurrentTenantDep, DatabaseDep,
     VectorServiceDep, LLMServiceDep, EmbeddingServiceDep
 )
 from app.models.query import Query, QueryResponse as QueryResponseModel
+from app.database.session import SessionLocal
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/queries", tags=["Queries & RAG"])
 
 
+def encode_history_cursor(query: Query) -> str:
+    """
+    Encode the position after a history row as an opaque cursor
+    """
+    return f"{query.created_at.isoformat()},{query.id}"
+
+
+def truncate_responses(queries: List[QueryResponse], preview_chars: int) -> None:
+    """
+    Cut each query's response text down to a preview, flagging the ones shortened
+    """
+    for item in queries:
+        if item.response and len(item.response.response_text) > preview_chars:
+            item.response.response_text = item.response.response_text[:preview_chars]
+            item.response.response_truncated = True
+
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    Decode a history cursor into its (created_at, id) position
+    """
+    try:
+        created_at, query_id = cursor.split(",", 1)
+        return datetime.fromisoformat(created_at), UUID(query_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid history cursor"
+        )
+
+
 @router.get("/debug/vector-status")
 async def debug_vector_status(
     current_user: CurrentUserDep,
@@ -102,7 +138,7 @@ async def debug_search_test(
     """
     try:
         # Generate embedding for the query
-        query_embedding = await embedding_service.embed_text(query)
+        query_embedding = await embedding_service.embed_query(query)
         
         # Perform search
         search_results = await vector_service.search_documents(
@@ -148,8 +184,9 @@ async def generate_rag_response(
     start_time = time.time()
     
     try:
-        # Generate query embedding
-        query_embedding = await embedding_service.embed_text(rag_request.query)
+        # Use tenant's LLM configuration if not specified
+        llm_provider = rag_request.llm_provider or current_tenant.llm_provider
+        llm_model = rag_request.llm_model or current_tenant.llm_model
         
         # Build filter conditions for document retrieval
         filter_conditions = {}
@@ -157,13 +194,22 @@ async def generate_rag_response(
             # Convert UUIDs to strings for filtering
             filter_conditions["document_id"] = [str(doc_id) for doc_id in rag_request.document_ids]
         
-        # Retrieve relevant documents from vector store
-        search_results = await vector_service.search_documents(
-            tenant_id=str(current_tenant.id),
-            query_embedding=query_embedding,
-            limit=rag_request.max_chunks,
-            score_threshold=rag_request.score_threshold,
-            filter_conditions=filter_conditions
+        async def retrieve():
+            # Generate query embedding and retrieve relevant documents from vector store
+            query_embedding = await embedding_service.embed_query(rag_request.query)
+            search_results = await vector_service.search_documents(
+                tenant_id=str(current_tenant.id),
+                query_embedding=query_embedding,
+                limit=rag_request.max_chunks,
+                score_threshold=rag_request.score_threshold,
+                filter_conditions=filter_conditions
+            )
+            return query_embedding, search_results
+        
+        # Overlap the provider connection setup with retrieval
+        _, (query_embedding, search_results) = await asyncio.gather(
+            llm_service.warm_provider(llm_provider),
+            retrieve()
         )
         
         # Format context documents
@@ -187,10 +233,6 @@ async def generate_rag_response(
         # Prepare context for LLM
         context_used = "\n\n".join(context_text_parts)
         
-        # Use tenant's LLM configuration if not specified
-        llm_provider = rag_request.llm_provider or current_tenant.llm_provider
-        llm_model = rag_request.llm_model or current_tenant.llm_model
-        
         # Generate LLM response
         llm_response = await llm_service.generate_rag_response(
             query=rag_request.query,
@@ -200,7 +242,9 @@ async def generate_rag_response(
             system_prompt=rag_request.system_prompt,
             temperature=rag_request.temperature,
             max_tokens=rag_request.max_tokens,
-            stream=False  # Non-streaming for this endpoint
+            stream=False,  # Non-streaming for this endpoint
+            tenant_id=str(current_tenant.id),
+            query_embedding=query_embedding
         )
         
         processing_time = (time.time() - start_time) * 1000
@@ -241,7 +285,8 @@ async def generate_rag_response(
             confidence_score=None,  # Could be calculated based on retrieval scores
             source_attribution=[doc.source for doc in context_documents],
             contains_citations=False,  # Could be analyzed
-            fact_checked=False
+            fact_checked=False,
+            cache_hit=llm_response.metadata.get("cache_hit", False)
         )
         
         db.add(response_record)
@@ -297,6 +342,83 @@ async def generate_rag_response(
         )
 
 
+async def record_streamed_query(
+    stream: AsyncIterator[str],
+    rag_request: RAGRequest,
+    tenant_id: UUID,
+    user_id: UUID,
+    llm_provider: str,
+    llm_model: str,
+    context_documents: List[dict],
+    start_time: float
+) -> AsyncIterator[str]:
+    """
+    Pass a response token stream through, recording the query and its response once it ends
+    
+    The request's database session is closed before the response body is
+    streamed, so the records are written with a session of their own. They
+    are committed before the stream is exhausted, i.e. before the final
+    [DONE] event reaches the client.
+    """
+    parts = []
+    finished = False
+    error = None
+    try:
+        async for chunk in stream:
+            parts.append(chunk)
+            yield chunk
+        finished = True
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        db = SessionLocal()
+        try:
+            # Streamed responses carry no token usage
+            query_record = Query(
+                tenant_id=tenant_id,
+                user_id=user_id,
+                query_text=rag_request.query,
+                query_type="rag",
+                processing_time_ms=(time.time() - start_time) * 1000,
+                status="completed" if finished else "failed",
+                retrieved_chunks_count=len(context_documents),
+                retrieved_documents=[str(doc["document_id"]) for doc in context_documents],
+                similarity_threshold=rag_request.score_threshold,
+                llm_provider=llm_provider,
+                llm_model=llm_model,
+                session_id=rag_request.session_id,
+                conversation_turn=rag_request.conversation_turn,
+                query_metadata={
+                    "rag_request": rag_request.model_dump(mode='json'),
+                    "streamed": True,
+                    **({} if finished else {"error": str(error) if error else "Stream interrupted"})
+                }
+            )
+            db.add(query_record)
+            db.flush()
+            
+            if parts:
+                db.add(QueryResponseModel(
+                    query_id=query_record.id,
+                    response_text="".join(parts),
+                    response_format="text",
+                    context_used="\n\n".join(doc["text"] for doc in context_documents),
+                    context_chunks=[str(doc["chunk_id"]) for doc in context_documents],
+                    source_attribution=[doc["source"] for doc in context_documents],
+                    contains_citations=False,
+                    fact_checked=False,
+                    cache_hit=False
+                ))
+            
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to record streamed RAG query: {e}")
+        finally:
+            db.close()
+
+
 @router.post("/rag/stream")
 async def generate_rag_response_stream(
     rag_request: RAGRequest,
@@ -310,16 +432,27 @@ async def generate_rag_response_stream(
     """
     Generate streaming RAG response
     """
+    start_time = time.time()
+    
     try:
-        # Generate query embedding
-        query_embedding = await embedding_service.embed_text(rag_request.query)
+        # Use tenant's LLM configuration if not specified
+        llm_provider = rag_request.llm_provider or current_tenant.llm_provider
+        llm_model = rag_request.llm_model or current_tenant.llm_model
         
-        # Retrieve relevant documents
-        search_results = await vector_service.search_documents(
-            tenant_id=str(current_tenant.id),
-            query_embedding=query_embedding,
-            limit=rag_request.max_chunks,
-            score_threshold=rag_request.score_threshold
+        async def retrieve():
+            # Generate query embedding and retrieve relevant documents
+            query_embedding = await embedding_service.embed_query(rag_request.query)
+            return await vector_service.search_documents(
+                tenant_id=str(current_tenant.id),
+                query_embedding=query_embedding,
+                limit=rag_request.max_chunks,
+                score_threshold=rag_request.score_threshold
+            )
+        
+        # Overlap the provider connection setup with retrieval
+        _, search_results = await asyncio.gather(
+            llm_service.warm_provider(llm_provider),
+            retrieve()
         )
         
         # Format context documents
@@ -337,10 +470,6 @@ async def generate_rag_response_stream(
             for result in search_results
         ]
         
-        # Use tenant's LLM configuration if not specified
-        llm_provider = rag_request.llm_provider or current_tenant.llm_provider
-        llm_model = rag_request.llm_model or current_tenant.llm_model
-        
         # Generate streaming response
         response_stream = await llm_service.generate_rag_response(
             query=rag_request.query,
@@ -353,22 +482,25 @@ async def generate_rag_response_stream(
             stream=True
         )
         
-        async def stream_generator():
-            try:
-                async for chunk in response_stream:
-                    yield f"data: {chunk}\n\n"
-                yield "data: [DONE]\n\n"
-            except Exception as e:
-                logger.error(f"Streaming error: {e}")
-                yield f"data: [ERROR: {str(e)}]\n\n"
-        
         return StreamingResponse(
-            stream_generator(),
-            media_type="text/plain",
+            llm_service.generate_stream_bytes(
+                record_streamed_query(
+                    response_stream,
+                    rag_request=rag_request,
+                    tenant_id=current_tenant.id,
+                    user_id=current_user.id,
+                    llm_provider=llm_provider,
+                    llm_model=llm_model,
+                    context_documents=context_documents,
+                    start_time=start_time
+                ),
+                context_documents=context_documents if rag_request.include_sources else None
+            ),
+            media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
                 "Connection": "keep-alive",
-                "Content-Type": "text/plain; charset=utf-8"
+                "X-Accel-Buffering": "no"  # Flush each event through reverse proxies
             }
         )
         
@@ -387,11 +519,22 @@ async def get_query_history(
     db: DatabaseDep,
     skip: int = 0,
     limit: int = 20,
-    session_id: Optional[str] = None
+    session_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    preview_chars: Optional[int] = None
 ):
     """
     Get query history for current user/tenant
+    
+    Pass the previous page's next_cursor to continue after its last row;
+    the cursor seeks by (created_at, id) instead of scanning past an offset.
+    Cursor pages skip counting the history, so total, page and pages are
+    null; GET /queries/history/stats gives the total.
+    With preview_chars, response texts are cut to that length and flagged
+    as truncated; the full text is available from GET /queries/{query_id}.
     """
+    position = decode_history_cursor(cursor) if cursor else None
+    
     try:
         query = db.query(Query).filter(
             Query.tenant_id == current_tenant.id,
@@ -401,17 +544,35 @@ async def get_query_history(
         if session_id:
             query = query.filter(Query.session_id == session_id)
         
-        query = query.order_by(Query.created_at.desc())
+        # Only offset pages are counted; cursor pages stay constant-time
+        total = None if position else query.count()
+        
+        query = query.order_by(Query.created_at.desc(), Query.id.desc())
+        
+        if position:
+            created_at, query_id = position
+            query = query.filter(or_(
+                Query.created_at < created_at,
+                and_(Query.created_at == created_at, Query.id < query_id)
+            ))
+        else:
+            query = query.offset(skip)
         
-        total = query.count()
-        queries = query.offset(skip).limit(limit).all()
+        # One extra row tells whether another page follows
+        queries = query.limit(limit + 1).all()
+        next_cursor = encode_history_cursor(queries[limit - 1]) if len(queries) > limit else None
+        
+        items = [QueryResponse.model_validate(q) for q in queries[:limit]]
+        if preview_chars and preview_chars > 0:
+            truncate_responses(items, preview_chars)
         
         return QueryHistory(
-            queries=queries,
+            queries=items,
             total=total,
-            page=skip // limit + 1,
+            page=None if position else skip // limit + 1,
             size=limit,
-            pages=(total + limit - 1) // limit
+            pages=None if position else (total + limit - 1) // limit,
+            next_cursor=next_cursor
         )
         
     except Exception as e:
@@ -422,6 +583,47 @@ async def get_query_history(
         )
 
 
+@router.get("/history/stats", response_model=QueryHistoryStats)
+async def get_query_history_stats(
+    current_user: CurrentUserDep,
+    current_tenant: CurrentTenantDep,
+    db: DatabaseDep,
+    session_id: Optional[str] = None
+):
+    """
+    Get aggregate statistics over the current user's query history
+    """
+    try:
+        query = db.query(
+            func.count(Query.id),
+            func.avg(Query.processing_time_ms),
+            func.sum(Query.total_tokens),
+            func.count(Query.id).filter(Query.status == "completed")
+        ).filter(
+            Query.tenant_id == current_tenant.id,
+            Query.user_id == current_user.id
+        )
+        
+        if session_id:
+            query = query.filter(Query.session_id == session_id)
+        
+        total_queries, avg_processing_time, total_tokens, completed = query.one()
+        
+        return QueryHistoryStats(
+            total_queries=total_queries,
+            avg_processing_time_ms=float(avg_processing_time or 0.0),
+            total_tokens=int(total_tokens or 0),
+            success_rate=completed / total_queries * 100 if total_queries else 0.0
+        )
+        
+    except Exception as e:
+        logger.error(f"Failed to get query history stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get query history statistics"
+        )
+
+
 @router.get("/{query_id}", response_model=QueryResponse)
 async def get_query(
     query_id: str,
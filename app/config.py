@@ -2,7 +2,7 @@
 Configuration settings for the Multi-Tenant RAG System
 """
 from functools import lru_cache
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
 
@@ -23,6 +23,19 @@ class Settings(BaseSettings):
     qdrant_host: str = Field(default="localhost", env="QDRANT_HOST")
     qdrant_port: int = Field(default=6333, env="QDRANT_PORT")
     qdrant_api_key: Optional[str] = Field(default=None, env="QDRANT_API_KEY")
+    qdrant_grpc_port: int = Field(default=6334, env="QDRANT_GRPC_PORT")  # Must be reachable while prefer_grpc is on
+    qdrant_prefer_grpc: bool = Field(default=True, env="QDRANT_PREFER_GRPC")
+    qdrant_pool_size: int = Field(default=100, env="QDRANT_POOL_SIZE")  # httpx pool; only applies to REST (prefer_grpc off)
+    qdrant_indexed_fields: Dict[str, str] = Field(default_factory=dict, env="QDRANT_INDEXED_FIELDS")  # {"field": "keyword"}
+    qdrant_scalar_quantization: bool = Field(default=True, env="QDRANT_SCALAR_QUANTIZATION")
+    qdrant_quantization_oversampling: float = Field(default=2.0, env="QDRANT_QUANTIZATION_OVERSAMPLING")
+    qdrant_on_disk: bool = Field(default=True, env="QDRANT_ON_DISK")
+    qdrant_search_timeout: int = Field(default=10, env="QDRANT_SEARCH_TIMEOUT")
+    qdrant_collection_per_tenant: bool = Field(default=False, env="QDRANT_COLLECTION_PER_TENANT")
+    qdrant_tenant_collection_cache_size: int = Field(default=256, env="QDRANT_TENANT_COLLECTION_CACHE_SIZE")
+    qdrant_indexing_threshold: int = Field(default=10000, env="QDRANT_INDEXING_THRESHOLD")  # KB; restored after bulk uploads if the collection has none set
+    qdrant_upsert_batch_size: int = Field(default=64, env="QDRANT_UPSERT_BATCH_SIZE")
+    qdrant_upsert_concurrency: int = Field(default=4, env="QDRANT_UPSERT_CONCURRENCY")
     
     # Authentication
     jwt_secret_key: str = Field(env="JWT_SECRET_KEY")
@@ -33,6 +46,16 @@ class Settings(BaseSettings):
     openai_api_key: Optional[str] = Field(default=None, env="OPENAI_API_KEY")
     anthropic_api_key: Optional[str] = Field(default=None, env="ANTHROPIC_API_KEY")
     default_llm_provider: str = Field(default="openai", env="DEFAULT_LLM_PROVIDER")
+    rag_context_tokens_per_document: int = Field(default=1024, env="RAG_CONTEXT_TOKENS_PER_DOCUMENT")
+    
+    # Semantic Caches
+    semantic_cache_threshold: float = Field(default=0.97, env="SEMANTIC_CACHE_THRESHOLD")
+    response_cache_ttl_seconds: int = Field(default=3600, env="RESPONSE_CACHE_TTL_SECONDS")
+    search_cache_ttl_seconds: int = Field(default=300, env="SEARCH_CACHE_TTL_SECONDS")
+    search_cache_redis_timeout: float = Field(default=0.2, env="SEARCH_CACHE_REDIS_TIMEOUT")  # seconds; search skips the cache on timeout
+    response_cache_max_temperature: float = Field(default=0.2, env="RESPONSE_CACHE_MAX_TEMPERATURE")
+    query_embedding_cache_size: int = Field(default=1024, env="QUERY_EMBEDDING_CACHE_SIZE")
+    query_embedding_cache_ttl_seconds: int = Field(default=3600, env="QUERY_EMBEDDING_CACHE_TTL_SECONDS")
     
     # Embedding Configuration
     embedding_model: str = Field(
@@ -40,6 +63,7 @@ class Settings(BaseSettings):
         env="EMBEDDING_MODEL"
     )
     embedding_dimension: int = Field(default=384, env="EMBEDDING_DIMENSION")
+    embedding_storage_dtype: str = Field(default="float16", env="EMBEDDING_STORAGE_DTYPE")  # float32, float16
     
     # Security
     allowed_hosts: Union[List[str], str] = Field(
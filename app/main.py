@@ -5,13 +5,14 @@ import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 import structlog
 
 from app.config import settings
 from app.database import init_db, create_tables
 from app.services.vector_service import QdrantVectorService
-from app.api import auth_router, documents_router, queries_router, tenants_router
+from app.api import auth_router, dashboard_router, documents_router, queries_router, tenants_router
 
 # Configure logging
 structlog.configure(
@@ -70,6 +71,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down Multi-Tenant RAG System")
+    await QdrantVectorService.close()
 
 
 # Create FastAPI application
@@ -91,6 +93,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON bodies (document lists, query history); SSE is excluded
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 
 # Exception handlers
 @app.exception_handler(HTTPException)
@@ -185,6 +190,7 @@ app.include_router(auth_router, prefix="/api/v1")
 app.include_router(documents_router, prefix="/api/v1")
 app.include_router(queries_router, prefix="/api/v1")
 app.include_router(tenants_router, prefix="/api/v1")
+app.include_router(dashboard_router, prefix="/api/v1")
 
 
 # Root endpoint
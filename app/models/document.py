@@ -3,7 +3,7 @@ Document-related database models
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, Float
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, Float, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from app.database.base import Base
@@ -15,6 +15,12 @@ class Document(Base):
     Each document belongs to a specific tenant for isolation
     """
     __tablename__ = "documents"
+    __table_args__ = (
+        # Supports per-tenant quota probes and status counts. create_all doesn't
+        # add indexes to existing tables; create it there by hand with
+        # CREATE INDEX CONCURRENTLY ix_documents_tenant_status ON documents (tenant_id, status);
+        Index("ix_documents_tenant_status", "tenant_id", "status"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id"), nullable=False, index=True)
@@ -3,7 +3,7 @@ Query-related database models
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, Float, Boolean
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, Float, Boolean, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from app.database.base import Base
@@ -15,6 +15,12 @@ class Query(Base):
     Tracks query history per tenant for analytics and improvement
     """
     __tablename__ = "queries"
+    __table_args__ = (
+        # Supports keyset pagination of a user's history, newest first. create_all
+        # doesn't add indexes to existing tables; create it there by hand with
+        # CREATE INDEX CONCURRENTLY ix_queries_tenant_user_created ON queries (tenant_id, user_id, created_at, id);
+        Index("ix_queries_tenant_user_created", "tenant_id", "user_id", "created_at", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id"), nullable=False, index=True)
@@ -13,6 +13,7 @@ from .query import (
     QueryRequest, QueryResponse, QueryHistory,
     RAGRequest, RAGResponse
 )
+from .dashboard import DashboardResponse
 
 __all__ = [
     # Auth schemas
@@ -26,4 +27,7 @@ __all__ = [
     # Query schemas
     "QueryRequest", "QueryResponse", "QueryHistory",
     "RAGRequest", "RAGResponse",
+    
+    # Dashboard schemas
+    "DashboardResponse",
 ]
\ No newline at end of file
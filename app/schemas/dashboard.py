@@ -0,0 +1,16 @@
+"""
+Dashboard Pydantic schemas
+"""
+from pydantic import BaseModel
+
+from app.schemas.auth import TenantResponse
+from app.schemas.document import DocumentList
+from app.schemas.query import QueryHistory, QueryHistoryStats
+
+
+class DashboardResponse(BaseModel):
+    """Schema for the combined tenant, document and history view"""
+    tenant: TenantResponse
+    documents: DocumentList
+    history: QueryHistory
+    history_stats: QueryHistoryStats
@@ -133,6 +133,7 @@ class QueryResponseData(BaseModel):
     is_cached: bool
     cache_hit: bool
     generated_at: datetime
+    response_truncated: bool = False
     
     class Config:
         from_attributes = True
@@ -141,10 +142,19 @@ class QueryResponseData(BaseModel):
 class QueryHistory(BaseModel):
     """Schema for query history"""
     queries: List[QueryResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # Not counted for cursor pages
+    page: Optional[int] = None
     size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class QueryHistoryStats(BaseModel):
+    """Schema for aggregate statistics over a user's query history"""
+    total_queries: int
+    avg_processing_time_ms: float
+    total_tokens: int
+    success_rate: float
 
 
 class QueryFeedback(BaseModel):
@@ -7,6 +7,7 @@ from .document_service import DocumentService
 from .vector_service import QdrantVectorService
 from .llm_service import LLMService
 from .embedding_service import EmbeddingService
+from .cache_service import SemanticCache
 
 __all__ = [
     "AuthService",
@@ -15,4 +16,5 @@ __all__ = [
     "QdrantVectorService",
     "LLMService",
     "EmbeddingService",
+    "SemanticCache",
 ]
\ No newline at end of file
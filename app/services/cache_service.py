@@ -0,0 +1,118 @@
+"""
+Semantic cache for reusing results of near-duplicate queries
+"""
+import logging
+from typing import Any, Callable, Hashable, Optional
+import numpy as np
+from cachetools import LRUCache, TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    In-process cache keyed by a namespace and a query embedding
+    
+    Lookups first try an exact match on the embedding bytes, then fall back
+    to the most similar cached embedding in the same namespace when its
+    cosine similarity reaches the configured threshold.
+    """
+    
+    def __init__(
+        self,
+        threshold: float = 0.97,
+        ttl: float = 3600,
+        maxsize: int = 256,
+        max_namespaces: int = 1024
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.maxsize = maxsize
+        
+        # namespace -> TTLCache(embedding bytes -> (normalized embedding, value))
+        self._namespaces: LRUCache = LRUCache(maxsize=max_namespaces)
+        
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        """
+        L2-normalize an embedding as a contiguous float32 vector
+        """
+        vector = np.ascontiguousarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def get(self, namespace: Hashable, embedding: np.ndarray) -> Optional[Any]:
+        """
+        Get the cached value for a query embedding, or None on miss
+        
+        Empty embeddings, as returned by a failed embedding call, always miss.
+        """
+        vector = self._normalize(embedding)
+        if not vector.size:
+            self.misses += 1
+            return None
+        
+        entries = self._namespaces.get(namespace)
+        entry = entries.get(vector.tobytes()) if entries is not None else None
+        
+        if entry is None and entries:
+            # Approximate match: one matrix-vector product over same-sized cached embeddings
+            candidates = [candidate for candidate in entries.values() if candidate[0].size == vector.size]
+            if candidates:
+                scores = np.stack([cached for cached, _ in candidates]) @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry = candidates[best]
+        
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        return entry[1]
+    
+    def set(self, namespace: Hashable, embedding: np.ndarray, value: Any) -> None:
+        """
+        Store a value for a query embedding; empty embeddings are not cached
+        """
+        vector = self._normalize(embedding)
+        if not vector.size:
+            return
+        
+        entries = self._namespaces.get(namespace)
+        if entries is None:
+            entries = TTLCache(maxsize=self.maxsize, ttl=self.ttl)
+            self._namespaces[namespace] = entries
+        
+        entries[vector.tobytes()] = (vector, value)
+    
+    def invalidate(self, namespace: Optional[Hashable] = None) -> None:
+        """
+        Drop cached entries for one namespace, or everything
+        """
+        if namespace is None:
+            self._namespaces.clear()
+        else:
+            self._namespaces.pop(namespace, None)
+    
+    def invalidate_matching(self, predicate: Callable[[Hashable], bool]) -> None:
+        """
+        Drop cached entries for every namespace the predicate accepts
+        """
+        for namespace in [ns for ns in self._namespaces if predicate(ns)]:
+            self._namespaces.pop(namespace, None)
+    
+    def stats(self) -> dict:
+        """
+        Get hit/miss counters
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "namespaces": len(self._namespaces)
+        }
@@ -1,6 +1,7 @@
 """
 Document processing service for file upload, text extraction, and chunking
 """
+import hashlib
 import os
 import uuid
 import aiofiles
@@ -215,14 +216,14 @@ class DocumentService:
                 overlap_size=50
             )
             
-            # Generate embeddings for chunks
-            embedded_chunks = await self.embedding_service.embed_document_chunks(chunks)
+            # Generate embeddings for chunks as row views into one shared buffer
+            await self.embedding_service.embed_chunk_batch(chunks)
             
             # Store chunks in database and vector store
             vector_documents = []
             chunk_records = []
             
-            for chunk_data in embedded_chunks:
+            for chunk_data in chunks:
                 # Create database record
                 chunk_record = DocumentChunk(
                     document_id=document.id,
@@ -232,7 +233,9 @@ class DocumentService:
                     chunk_size=chunk_data["chunk_size"],
                     start_char=chunk_data["start_char"],
                     end_char=chunk_data["end_char"],
-                    vector_id=str(uuid.uuid4()),
+                    vector_id=self.vector_service.point_id(
+                        str(tenant_id), str(document.id), chunk_data["chunk_index"]
+                    ),
                     embedding_model=chunk_data["embedding_model"],
                     embedding_dimension=chunk_data["embedding_dimension"]
                 )
@@ -244,6 +247,8 @@ class DocumentService:
                     "document_id": str(document.id),
                     "chunk_id": str(chunk_record.id),
                     "text": chunk_data["text"],
+                    "chunk_index": chunk_data["chunk_index"],
+                    "content_hash": hashlib.sha256(chunk_data["text"].encode("utf-8")).hexdigest(),
                     "embedding": chunk_data["embedding"],
                     "source": document.original_filename,  # Add source field
                     "page_number": chunk_data.get("page_number"),
@@ -271,8 +276,8 @@ class DocumentService:
                 document.status = "processed"
                 document.total_chunks = len(chunks)
                 document.processed_chunks = len(chunks)
-                document.collection_name = self.vector_service.default_collection
-                document.embedding_model = embedded_chunks[0]["embedding_model"]
+                document.collection_name = self.vector_service.collection_for_tenant(str(tenant_id))
+                document.embedding_model = chunks[0]["embedding_model"]
                 
                 db.commit()
                 
@@ -1,14 +1,28 @@
 """
 Embedding service for text vectorization using various models
 """
+import asyncio
 import logging
 from typing import List, Union, Dict, Any
+import numpy as np
+from cachetools import TTLCache
 from sentence_transformers import SentenceTransformer
 import openai
+from tenacity import retry, stop_after_attempt, wait_exponential
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# OpenAI embedding requests are sharded and sent concurrently
+OPENAI_EMBEDDING_BATCH_SIZE = 96
+OPENAI_EMBEDDING_CONCURRENCY = 8
+
+# Shared across requests: EmbeddingService is instantiated per request
+_query_embedding_cache = TTLCache(
+    maxsize=settings.query_embedding_cache_size,
+    ttl=settings.query_embedding_cache_ttl_seconds
+)
+
 
 class EmbeddingService:
     """
@@ -18,14 +32,16 @@ class EmbeddingService:
     def __init__(self):
         self.model_name = settings.embedding_model
         self.dimension = settings.embedding_dimension
+        self.storage_dtype = np.dtype(settings.embedding_storage_dtype)
         
         # Initialize local embedding model
         self._local_model = None
         self._load_local_model()
         
         # Configure OpenAI if API key is available
+        self._openai_client = None
         if settings.openai_api_key:
-            openai.api_key = settings.openai_api_key
+            self._openai_client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
     
     def _load_local_model(self):
         """
@@ -41,7 +57,7 @@ class EmbeddingService:
         self, 
         text: Union[str, List[str]], 
         model_provider: str = "local"
-    ) -> Union[List[float], List[List[float]]]:
+    ) -> np.ndarray:
         """
         Generate embeddings for text using specified provider
         
@@ -50,7 +66,7 @@ class EmbeddingService:
             model_provider: Provider to use ("local", "openai")
         
         Returns:
-            Embedding vector(s)
+            Embedding vector of shape (D,) or matrix of shape (N, D)
         """
         if isinstance(text, str):
             text = [text]
@@ -64,13 +80,30 @@ class EmbeddingService:
             else:
                 embeddings = await self._embed_with_local_model(text)
             
-            return embeddings[0] if single_text and embeddings else embeddings
-            
+            return embeddings[0] if single_text and len(embeddings) else embeddings
+        
         except Exception as e:
             logger.error(f"Embedding generation failed: {e}")
-            return [] if single_text else [[]]
+            return np.empty(0, dtype=np.float32) if single_text else np.empty((0, 0), dtype=np.float32)
     
-    async def _embed_with_local_model(self, texts: List[str]) -> List[List[float]]:
+    async def embed_query(self, query: str, model_provider: str = "local") -> np.ndarray:
+        """
+        Embed a search query, reusing the embedding of a previously seen identical query
+        
+        Queries are matched after stripping and collapsing whitespace. Failed
+        embeddings are not cached.
+        """
+        key = (model_provider, " ".join(query.split()))
+        embedding = _query_embedding_cache.get(key)
+        if embedding is None:
+            embedding = await self.embed_text(key[1], model_provider)
+            if embedding.size:
+                # Cached arrays are shared between requests, so they must not be modified
+                embedding.setflags(write=False)
+                _query_embedding_cache[key] = embedding
+        return embedding
+    
+    async def _embed_with_local_model(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings using local SentenceTransformer model
         """
@@ -83,26 +116,48 @@ class EmbeddingService:
             normalize_embeddings=True
         )
         
-        return embeddings.tolist()
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
     
-    async def _embed_with_openai(self, texts: List[str]) -> List[List[float]]:
+    async def _embed_with_openai(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings using OpenAI API
         """
         try:
-            response = await openai.Embedding.acreate(
-                input=texts,
-                model="text-embedding-ada-002"
-            )
+            semaphore = asyncio.Semaphore(OPENAI_EMBEDDING_CONCURRENCY)
+            
+            async def embed_batch(batch: List[str]) -> List[List[float]]:
+                async with semaphore:
+                    return await self._embed_openai_batch(batch)
             
-            embeddings = [item['embedding'] for item in response['data']]
-            return embeddings
+            # gather preserves shard order, so rows line up with texts
+            results = await asyncio.gather(*[
+                embed_batch(texts[i:i + OPENAI_EMBEDDING_BATCH_SIZE])
+                for i in range(0, len(texts), OPENAI_EMBEDDING_BATCH_SIZE)
+            ])
             
+            embeddings = [embedding for batch in results for embedding in batch]
+            return np.asarray(embeddings, dtype=np.float32)
+        
         except Exception as e:
             logger.error(f"OpenAI embedding failed: {e}")
             # Fallback to local model
             return await self._embed_with_local_model(texts)
     
+    @retry(wait=wait_exponential(multiplier=0.5, max=8), stop=stop_after_attempt(3), reraise=True)
+    async def _embed_openai_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed one shard of texts with the OpenAI API, retrying transient failures
+        """
+        if self._openai_client is None:
+            raise ValueError("OpenAI client not configured")
+        
+        response = await self._openai_client.embeddings.create(
+            input=texts,
+            model="text-embedding-ada-002"
+        )
+        
+        return [item.embedding for item in response.data]
+    
     def get_embedding_dimension(self, model_provider: str = "local") -> int:
         """
         Get embedding dimension for the specified provider
@@ -192,33 +247,57 @@ class EmbeddingService:
         if not chunks:
             return []
         
+        await self.embed_chunk_batch(chunks, model_provider)
+        return chunks
+    
+    async def embed_chunk_batch(
+        self,
+        chunks: List[Dict[str, Any]],
+        model_provider: str = "local"
+    ) -> np.ndarray:
+        """
+        Embed chunks into a single contiguous buffer
+        
+        Each chunk gets a row view into the returned (N, D) buffer rather than
+        its own copy, so callers that keep the buffer alive (e.g. through the
+        vector store upsert) hold one allocation per document.
+        
+        Args:
+            chunks: List of chunk dictionaries
+            model_provider: Provider to use for embeddings
+        
+        Returns:
+            Embedding matrix of shape (N, D) as float32
+        """
+        if not chunks:
+            return np.empty((0, 0), dtype=np.float32)
+        
         # Extract text from chunks
         texts = [chunk["text"] for chunk in chunks]
         
-        # Generate embeddings
-        embeddings = await self.embed_text(texts, model_provider)
+        # Generate embeddings; Qdrant narrows them to the storage dtype on write
+        embeddings = np.asarray(await self.embed_text(texts, model_provider), dtype=np.float32)
         
-        # Add embeddings to chunks
+        # Add embeddings to chunks as row views into the batch buffer
         for i, chunk in enumerate(chunks):
             chunk["embedding"] = embeddings[i]
+            chunk["embedding_dtype"] = self.storage_dtype.name
             chunk["embedding_model"] = self.model_name
-            chunk["embedding_dimension"] = len(embeddings[i])
+            chunk["embedding_dimension"] = embeddings.shape[1]
         
-        return chunks
+        return embeddings
     
     def calculate_similarity(
         self, 
-        embedding1: List[float], 
-        embedding2: List[float]
+        embedding1: np.ndarray, 
+        embedding2: np.ndarray
     ) -> float:
         """
         Calculate cosine similarity between two embeddings
         """
-        import numpy as np
-        
-        # Convert to numpy arrays
-        vec1 = np.array(embedding1)
-        vec2 = np.array(embedding2)
+        # Views for float32 arrays, conversion only for other inputs
+        vec1 = np.asarray(embedding1, dtype=np.float32)
+        vec2 = np.asarray(embedding2, dtype=np.float32)
         
         # Calculate cosine similarity
         dot_product = np.dot(vec1, vec2)
@@ -1,19 +1,39 @@
 """
 Modular LLM service supporting multiple providers (OpenAI, Anthropic, local models)
 """
-import json
+import hashlib
 import logging
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, AsyncGenerator, Union
-from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, AsyncGenerator, AsyncIterator, Tuple, Union
+from dataclasses import dataclass, replace
+from functools import lru_cache
+import numpy as np
+import orjson
+import tiktoken
 
 # LLM Provider imports
 import openai
 import anthropic
 from app.config import settings
+from app.services.cache_service import SemanticCache
 
 logger = logging.getLogger(__name__)
 
+_DEFAULT_SYSTEM_PROMPT = """You are a helpful AI assistant. Use the provided context to answer the user's question accurately and comprehensively. If the context doesn't contain enough information to answer the question, please say so clearly.
+
+Guidelines:
+- Base your answer primarily on the provided context
+- Be factual and precise
+- If you're uncertain about something, acknowledge it
+- Cite relevant parts of the context when appropriate
+- If the context is insufficient, clearly state that limitation"""
+
+# Shared across requests: LLMService is instantiated per request
+_response_cache = SemanticCache(
+    threshold=settings.semantic_cache_threshold,
+    ttl=settings.response_cache_ttl_seconds
+)
+
 
 @dataclass
 class LLMResponse:
@@ -53,6 +73,10 @@ class BaseLLMProvider(ABC):
         """Generate streaming response from LLM"""
         pass
     
+    async def warm(self) -> None:
+        """Open the provider connection ahead of the first request"""
+        pass
+    
     @abstractmethod
     def get_available_models(self) -> List[str]:
         """Get list of available models"""
@@ -63,9 +87,28 @@ class OpenAIProvider(BaseLLMProvider):
     """OpenAI API provider"""
     
     def __init__(self, api_key: str):
-        self.client = openai.AsyncOpenAI(api_key=api_key)
+        self.http_client = openai.DefaultAsyncHttpxClient()
+        self.client = openai.AsyncOpenAI(api_key=api_key, http_client=self.http_client)
         self.provider_name = "openai"
     
+    async def warm(self) -> None:
+        """Establish the TLS connection so the completion request reuses it"""
+        try:
+            await self.http_client.head(str(self.client.base_url))
+        except Exception as e:
+            logger.debug(f"OpenAI connection warm-up failed: {e}")
+    
+    @staticmethod
+    def _prompt_cache_key(messages: List[Dict[str, str]]) -> Optional[str]:
+        """
+        Derive a stable prompt cache key from the system prompt so requests
+        sharing the same static prefix are routed to the same prompt cache
+        """
+        for msg in messages:
+            if msg["role"] == "system":
+                return hashlib.sha256(msg["content"].encode("utf-8")).hexdigest()[:32]
+        return None
+    
     async def generate_response(
         self,
         messages: List[Dict[str, str]],
@@ -76,6 +119,9 @@ class OpenAIProvider(BaseLLMProvider):
     ) -> LLMResponse:
         """Generate response using OpenAI API"""
         try:
+            cache_key = self._prompt_cache_key(messages)
+            if cache_key:
+                kwargs.setdefault("prompt_cache_key", cache_key)
             response = await self.client.chat.completions.create(
                 model=model,
                 messages=messages,
@@ -114,6 +160,9 @@ class OpenAIProvider(BaseLLMProvider):
     ) -> AsyncGenerator[str, None]:
         """Generate streaming response using OpenAI API"""
         try:
+            cache_key = self._prompt_cache_key(messages)
+            if cache_key:
+                kwargs.setdefault("prompt_cache_key", cache_key)
             response = await self.client.chat.completions.create(
                 model=model,
                 messages=messages,
@@ -146,9 +195,51 @@ class AnthropicProvider(BaseLLMProvider):
     """Anthropic Claude API provider"""
     
     def __init__(self, api_key: str):
-        self.client = anthropic.AsyncAnthropic(api_key=api_key)
+        self.http_client = anthropic.DefaultAsyncHttpxClient()
+        self.client = anthropic.AsyncAnthropic(api_key=api_key, http_client=self.http_client)
         self.provider_name = "anthropic"
     
+    async def warm(self) -> None:
+        """Establish the TLS connection so the messages request reuses it"""
+        try:
+            await self.http_client.head(str(self.client.base_url))
+        except Exception as e:
+            logger.debug(f"Anthropic connection warm-up failed: {e}")
+    
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def _system_blocks(system_message: str) -> List[Dict[str, Any]]:
+        """
+        Build the system prompt as a cacheable content block so Anthropic can
+        reuse the prefill of the static prefix across requests
+        """
+        return [{
+            "type": "text",
+            "text": system_message,
+            "cache_control": {"type": "ephemeral"}
+        }]
+    
+    def _split_system(
+        self,
+        messages: List[Dict[str, str]]
+    ) -> Tuple[Union[str, List[Dict[str, Any]]], List[Dict[str, str]]]:
+        """
+        Split OpenAI-style messages into an Anthropic system prompt and
+        the user/assistant turns
+        """
+        system_message = ""
+        claude_messages = []
+        
+        for msg in messages:
+            if msg["role"] == "system":
+                system_message = msg["content"]
+            elif msg["role"] in ["user", "assistant"]:
+                claude_messages.append(msg)
+        
+        if system_message:
+            return self._system_blocks(system_message), claude_messages
+        return system_message, claude_messages
+    
     async def generate_response(
         self,
         messages: List[Dict[str, str]],
@@ -160,14 +251,7 @@ class AnthropicProvider(BaseLLMProvider):
         """Generate response using Anthropic API"""
         try:
             # Convert OpenAI format to Anthropic format
-            system_message = ""
-            claude_messages = []
-            
-            for msg in messages:
-                if msg["role"] == "system":
-                    system_message = msg["content"]
-                elif msg["role"] in ["user", "assistant"]:
-                    claude_messages.append(msg)
+            system_message, claude_messages = self._split_system(messages)
             
             response = await self.client.messages.create(
                 model=model,
@@ -208,14 +292,7 @@ class AnthropicProvider(BaseLLMProvider):
         """Generate streaming response using Anthropic API"""
         try:
             # Convert OpenAI format to Anthropic format
-            system_message = ""
-            claude_messages = []
-            
-            for msg in messages:
-                if msg["role"] == "system":
-                    system_message = msg["content"]
-                elif msg["role"] in ["user", "assistant"]:
-                    claude_messages.append(msg)
+            system_message, claude_messages = self._split_system(messages)
             
             async with self.client.messages.stream(
                 model=model,
@@ -322,6 +399,42 @@ class LLMService:
             raise ValueError(f"Provider '{provider_name}' not available")
         return self.providers[provider_name]
     
+    async def warm_provider(self, provider_name: Optional[str] = None) -> None:
+        """
+        Warm up a provider connection while context retrieval is in flight
+        """
+        llm_provider = self.providers.get(provider_name or self.default_provider)
+        if llm_provider is not None:
+            await llm_provider.warm()
+    
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _get_encoding() -> Optional[tiktoken.Encoding]:
+        """Load the tokenizer used for context budgeting, if available"""
+        try:
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"Tokenizer unavailable, context will not be truncated: {e}")
+            return None
+    
+    def _truncate_to_budget(self, text: str) -> str:
+        """
+        Truncate a context document to the per-document token budget
+        """
+        budget = settings.rag_context_tokens_per_document
+        # A token spans at least one character, so short texts fit the budget
+        if budget <= 0 or len(text) <= budget:
+            return text
+        
+        encoding = self._get_encoding()
+        if encoding is None:
+            return text
+        
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= budget:
+            return text
+        return encoding.decode(tokens[:budget])
+    
     def build_rag_prompt(
         self,
         query: str,
@@ -332,28 +445,21 @@ class LLMService:
         Build RAG prompt with retrieved context
         """
         if system_prompt is None:
-            system_prompt = """You are a helpful AI assistant. Use the provided context to answer the user's question accurately and comprehensively. If the context doesn't contain enough information to answer the question, please say so clearly.
-
-Guidelines:
-- Base your answer primarily on the provided context
-- Be factual and precise
-- If you're uncertain about something, acknowledge it
-- Cite relevant parts of the context when appropriate
-- If the context is insufficient, clearly state that limitation"""
+            system_prompt = _DEFAULT_SYSTEM_PROMPT
         
-        # Build context section
-        context_text = ""
+        # Build user message in one join instead of repeated concatenation
+        parts = [f"Question: {query}"]
         if context_documents:
-            context_text = "\n\nContext Documents:\n"
+            parts.append("\n\nContext Documents:\n")
             for i, doc in enumerate(context_documents, 1):
                 source = doc.get("source", "Unknown")
-                text = doc.get("text", "")
-                context_text += f"\n[Document {i} - {source}]\n{text}\n"
+                text = self._truncate_to_budget(doc.get("text", ""))
+                parts.append(f"\n[Document {i} - {source}]\n{text}\n")
         
         # Build messages
         messages = [
             {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Question: {query}{context_text}"}
+            {"role": "user", "content": "".join(parts)}
         ]
         
         return messages
@@ -367,10 +473,16 @@ Guidelines:
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 1000,
-        stream: bool = False
+        stream: bool = False,
+        tenant_id: Optional[str] = None,
+        query_embedding: Optional[np.ndarray] = None
     ) -> Union[LLMResponse, AsyncGenerator[str, None]]:
         """
         Generate RAG response with retrieved context
+        
+        Non-streaming, low-temperature responses are cached per tenant when a
+        query embedding is given, so near-duplicate questions over the same
+        context skip the provider call.
         """
         # Use default provider if not specified
         if provider is None:
@@ -395,13 +507,55 @@ Guidelines:
                 temperature=temperature,
                 max_tokens=max_tokens
             )
-        else:
-            return await llm_provider.generate_response(
-                messages=messages,
-                model=model,
-                temperature=temperature,
-                max_tokens=max_tokens
+        
+        use_cache = (
+            tenant_id is not None
+            and query_embedding is not None
+            and temperature <= settings.response_cache_max_temperature
+        )
+        if use_cache:
+            namespace = (
+                tenant_id, provider, model, system_prompt, max_tokens,
+                tuple(sorted(str(doc.get("chunk_id")) for doc in context_documents))
             )
+            cached = _response_cache.get(namespace, query_embedding)
+            if cached is not None:
+                return replace(cached, metadata={**cached.metadata, "cache_hit": True})
+        
+        response = await llm_provider.generate_response(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        
+        if use_cache:
+            _response_cache.set(namespace, query_embedding, response)
+        
+        return response
+    
+    async def generate_stream_bytes(
+        self,
+        stream: AsyncGenerator[str, None],
+        context_documents: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Frame a token stream as pre-encoded server-sent events
+        
+        Each token is written as its own ``data:`` event so it can be flushed
+        to the client as soon as the provider emits it. Context documents, if
+        given, are sent first as a single ``{"context_documents": [...]}`` event.
+        """
+        if context_documents is not None:
+            yield b"data: " + orjson.dumps({"context_documents": context_documents}) + b"\n\n"
+        
+        try:
+            async for chunk in stream:
+                yield b"data: " + orjson.dumps({"delta": chunk}) + b"\n\n"
+            yield b"data: [DONE]\n\n"
+        except Exception as e:
+            logger.error(f"Streaming error: {e}")
+            yield b"data: " + orjson.dumps({"error": str(e)}) + b"\n\n"
     
     def get_available_providers(self) -> List[str]:
         """Get list of available providers"""
@@ -1,14 +1,20 @@
 """
 Tenant service for multi-tenant isolation and management
 """
+import re
 import uuid
 from typing import Optional, List, Dict, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func
 from fastapi import HTTPException, status
 from app.models.tenant import Tenant, TenantUser
 from app.models.document import Document
 
+_UUID_RE = re.compile(
+    r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$",
+    re.IGNORECASE
+)
+
 
 class TenantService:
     """
@@ -58,13 +64,18 @@ class TenantService:
     def get_tenant_by_id(self, db: Session, tenant_id: str) -> Optional[Tenant]:
         """
         Get tenant by ID with validation
+        
+        Uses the session identity map, so repeated lookups of the same tenant
+        within a request are served without another query.
         """
-        tenant = db.query(Tenant).filter(
-            and_(
-                Tenant.id == tenant_id,
-                Tenant.is_active == True
-            )
-        ).first()
+        try:
+            tenant_uuid = tenant_id if isinstance(tenant_id, uuid.UUID) else uuid.UUID(str(tenant_id))
+        except ValueError:
+            return None
+        
+        tenant = db.get(Tenant, tenant_uuid)
+        if tenant is None or not tenant.is_active:
+            return None
         
         return tenant
     
@@ -89,13 +100,10 @@ class TenantService:
         """
         Get tenant by ID or subdomain (flexible lookup)
         """
-        # Try by UUID first
-        try:
-            tenant_uuid = uuid.UUID(identifier)
-            return self.get_tenant_by_id(db, str(tenant_uuid))
-        except ValueError:
-            # If not a valid UUID, try subdomain
-            return self.get_tenant_by_subdomain(db, identifier)
+        # Canonical UUIDs are looked up by ID, anything else as a subdomain
+        if _UUID_RE.match(identifier):
+            return self.get_tenant_by_id(db, identifier)
+        return self.get_tenant_by_subdomain(db, identifier)
     
     def list_tenants(
         self, 
@@ -162,33 +170,34 @@ class TenantService:
         """
         Get tenant statistics
         """
-        tenant = self.get_tenant_by_id(db, tenant_id)
-        if not tenant:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Tenant not found"
-            )
-        
-        # Count users
-        user_count = db.query(TenantUser).filter(
+        # Load tenant with its active user count in one round-trip
+        user_count_subquery = db.query(func.count(TenantUser.id)).filter(
             and_(
-                TenantUser.tenant_id == tenant_id,
+                TenantUser.tenant_id == Tenant.id,
                 TenantUser.is_active == True
             )
-        ).count()
+        ).correlate(Tenant).scalar_subquery()
         
-        # Count documents
-        doc_count = db.query(Document).filter(
-            Document.tenant_id == tenant_id
-        ).count()
-        
-        # Count processed documents
-        processed_doc_count = db.query(Document).filter(
+        row = db.query(Tenant, user_count_subquery).filter(
             and_(
-                Document.tenant_id == tenant_id,
-                Document.status == "processed"
+                Tenant.id == tenant_id,
+                Tenant.is_active == True
             )
-        ).count()
+        ).first()
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Tenant not found"
+            )
+        tenant, user_count = row
+        
+        # Count total and processed documents in a single scan
+        doc_count, processed_doc_count = db.query(
+            func.count(Document.id),
+            func.count(Document.id).filter(Document.status == "processed")
+        ).filter(
+            Document.tenant_id == tenant_id
+        ).one()
         
         return {
             "tenant_id": tenant_id,
@@ -217,15 +226,17 @@ class TenantService:
         """
         Validate tenant quotas (documents, queries, etc.)
         """
+        # Served from the session identity map when the request already loaded the tenant
         tenant = self.get_tenant_by_id(db, tenant_id)
         if not tenant:
             return False
         
         if quota_type == "documents":
             if current_count is None:
-                current_count = db.query(Document).filter(
+                # Bounded probe: stop counting once the quota is reached
+                current_count = db.query(Document.id).filter(
                     Document.tenant_id == tenant_id
-                ).count()
+                ).limit(tenant.max_documents).count()
             return current_count < tenant.max_documents
         
         # Add more quota types as needed
@@ -3,48 +3,281 @@ Qdrant vector store service for multi-tenant document storage and retrieval
 """
 import asyncio
 import logging
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import islice
 from typing import List, Dict, Any, Optional, Tuple
-from uuid import uuid4
-from qdrant_client import QdrantClient, AsyncQdrantClient
+from uuid import UUID, uuid5
+import httpx
+import numpy as np
+import redis.asyncio as redis
+from cachetools import LRUCache
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.models import (
     VectorParams, Distance, CollectionInfo, 
-    PointStruct, Filter, FieldCondition, MatchValue
+    Filter, FieldCondition, MatchValue
 )
 from app.config import settings
+from app.services.cache_service import SemanticCache
 
 logger = logging.getLogger(__name__)
 
+# Namespace for deterministic point ids, so re-ingesting a chunk overwrites it
+_POINT_ID_NAMESPACE = UUID("6f1c1f0e-3c1a-5b7e-9a44-2d6a0c8e4b1d")
+
+
+@lru_cache(maxsize=1024)
+def _tenant_condition(tenant_id: str) -> FieldCondition:
+    """
+    Tenant isolation condition, reused across searches and deletes
+    """
+    return FieldCondition(
+        key="tenant_id",
+        match=MatchValue(value=tenant_id)
+    )
+
+
+# Process-wide Qdrant client, created on first use
+_async_client: Optional[AsyncQdrantClient] = None
+
+# Per-tenant collections already ensured in this process, most recent last
+_tenant_collections: "OrderedDict[str, None]" = OrderedDict()
+
+# (collection, tenant_id, document_id, point_id) -> content_hash known to be stored
+_stored_hashes: LRUCache = LRUCache(maxsize=100_000)
+
+# collection -> [bulk uploads in progress, indexing threshold to restore after the last one];
+# overlapping bulk uploads in this process share one pause of HNSW indexing
+_bulk_uploads: Dict[str, List[Optional[int]]] = {}
+_bulk_uploads_lock = asyncio.Lock()
+
+# Shared across requests: QdrantVectorService is instantiated per request
+_search_cache = SemanticCache(
+    threshold=settings.semantic_cache_threshold,
+    ttl=settings.search_cache_ttl_seconds
+)
+
+# Process-wide Redis client holding per-tenant search cache generations, created on first use
+_redis_client: Optional[redis.Redis] = None
+
 
 class QdrantVectorService:
     """
     Qdrant vector database service with multi-tenant support
     """
     
+    # Payload fields indexed for filtering, in addition to tenant_id
+    INDEX_FIELDS: Dict[str, models.PayloadSchemaType] = {
+        "document_id": models.PayloadSchemaType.KEYWORD,
+        "chunk_id": models.PayloadSchemaType.KEYWORD,
+        "source": models.PayloadSchemaType.KEYWORD,
+        "page_number": models.PayloadSchemaType.INTEGER,
+        "chunk_index": models.PayloadSchemaType.INTEGER,
+        "content_hash": models.PayloadSchemaType.KEYWORD,
+    }
+    
     def __init__(self):
-        # Initialize Qdrant clients with HTTP (no SSL for local Docker)
-        self.client = QdrantClient(
-            host=settings.qdrant_host,
-            port=settings.qdrant_port,
-            api_key=settings.qdrant_api_key,
-            timeout=30.0,
-            prefer_grpc=False,  # Use HTTP instead of gRPC
-            https=False,  # Disable HTTPS for local Docker environment
-            check_compatibility=False  # Skip version compatibility check
+        self.default_collection = "multi_tenant_documents"
+        self.embedding_dimension = settings.embedding_dimension
+    
+    @property
+    def async_client(self) -> AsyncQdrantClient:
+        """
+        Qdrant client shared by every service instance in the process
+        """
+        global _async_client
+        if _async_client is None:
+            # No await between check and assignment, so this is safe on the event loop
+            _async_client = AsyncQdrantClient(**self._client_kwargs())
+        return _async_client
+    
+    @property
+    def redis_client(self) -> redis.Redis:
+        """
+        Redis client shared by every service instance in the process
+        """
+        global _redis_client
+        if _redis_client is None:
+            _redis_client = redis.from_url(
+                settings.redis_url,
+                socket_timeout=settings.search_cache_redis_timeout,
+                socket_connect_timeout=settings.search_cache_redis_timeout
+            )
+        return _redis_client
+    
+    @staticmethod
+    def _client_kwargs() -> Dict[str, Any]:
+        """
+        Connection settings for the Qdrant client (no SSL for local Docker)
+        """
+        pool_size = settings.qdrant_pool_size
+        return {
+            "host": settings.qdrant_host,
+            "port": settings.qdrant_port,
+            "grpc_port": settings.qdrant_grpc_port,
+            "api_key": settings.qdrant_api_key,
+            "timeout": 30.0,
+            "prefer_grpc": settings.qdrant_prefer_grpc,  # Binary protobuf vectors instead of JSON
+            "https": False,  # Disable HTTPS for local Docker environment
+            "check_compatibility": False,  # Skip version compatibility check
+            # Keep enough pooled connections for concurrent searches and upserts;
+            # only the REST transport uses this pool, gRPC keeps its own channel
+            "limits": httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size
+            )
+        }
+    
+    def _index_fields(self) -> Dict[str, models.PayloadSchemaType]:
+        """
+        Get payload fields to index, including configured extra fields
+        """
+        fields = dict(self.INDEX_FIELDS)
+        for field_name, field_schema in settings.qdrant_indexed_fields.items():
+            fields[field_name] = models.PayloadSchemaType(field_schema)
+        return fields
+    
+    def _hnsw_config(self, collection_name: str) -> Optional[models.HnswConfigDiff]:
+        """
+        HNSW layout for a collection
+        
+        The shared collection builds graphs per tenant instead of one global
+        graph, since every search is tenant-filtered. Per-tenant collections
+        keep the default global graph.
+        """
+        if collection_name == self.default_collection:
+            return models.HnswConfigDiff(payload_m=16, m=0)
+        return None
+    
+    def collection_for_tenant(self, tenant_id: str) -> str:
+        """
+        Name of the collection holding a tenant's vectors
+        """
+        if settings.qdrant_collection_per_tenant:
+            return f"{self.default_collection}_{tenant_id}"
+        return self.default_collection
+    
+    async def ensure_tenant_collection(self, tenant_id: str) -> str:
+        """
+        Create a tenant's collection on first use and return its name
+        
+        Ensured names are tracked in a bounded LRU so hot tenants skip the
+        existence check; evicted tenants are simply re-checked on next use.
+        """
+        collection_name = self.collection_for_tenant(tenant_id)
+        if collection_name in _tenant_collections:
+            _tenant_collections.move_to_end(collection_name)
+            return collection_name
+        
+        if await self.init_collection(collection_name):
+            _tenant_collections[collection_name] = None
+            while len(_tenant_collections) > settings.qdrant_tenant_collection_cache_size:
+                _tenant_collections.popitem(last=False)
+        
+        return collection_name
+    
+    async def _resolve_collection(self, tenant_id: str, collection_name: Optional[str]) -> str:
+        """
+        Use an explicit collection name, otherwise the tenant's collection
+        """
+        if collection_name is not None:
+            return collection_name
+        if settings.qdrant_collection_per_tenant:
+            return await self.ensure_tenant_collection(tenant_id)
+        return self.default_collection
+    
+    def _quantization_config(self) -> Optional[models.ScalarQuantization]:
+        """
+        Int8 scalar quantization kept in RAM; original vectors are used for rescoring
+        """
+        if not settings.qdrant_scalar_quantization:
+            return None
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True
+            )
         )
+    
+    def _search_params(
+        self,
+        limit: int,
+        hnsw_ef: Optional[int] = None
+    ) -> models.SearchParams:
+        """
+        Search parameters for tenant-filtered queries
         
-        self.async_client = AsyncQdrantClient(
-            host=settings.qdrant_host,
-            port=settings.qdrant_port,
-            api_key=settings.qdrant_api_key,
-            timeout=30.0,
-            prefer_grpc=False,  # Use HTTP instead of gRPC
-            https=False,  # Disable HTTPS for local Docker environment
-            check_compatibility=False  # Skip version compatibility check
+        A wider ef keeps filtered HNSW traversal from running out of candidates
+        before finding `limit` matches. With quantization enabled, search runs
+        over quantized vectors and rescores an oversampled candidate set.
+        """
+        quantization = None
+        if settings.qdrant_scalar_quantization:
+            quantization = models.QuantizationSearchParams(
+                rescore=True,
+                oversampling=settings.qdrant_quantization_oversampling
+            )
+        
+        return models.SearchParams(
+            hnsw_ef=hnsw_ef or max(128, limit * 4),
+            exact=False,
+            quantization=quantization
         )
+    
+    def _vector_datatype(self) -> Optional[models.Datatype]:
+        """
+        Map the configured embedding storage dtype to a Qdrant vector datatype
+        """
+        if settings.embedding_storage_dtype == "float16":
+            return models.Datatype.FLOAT16
+        return None
+    
+    async def _check_collection_config(self, collection_name: str) -> None:
+        """
+        Warn when an existing collection was created with a different vector config
         
-        self.default_collection = "multi_tenant_documents"
-        self.embedding_dimension = settings.embedding_dimension
+        Qdrant cannot change distance, datatype or storage in place, so the
+        collection has to be recreated (and documents re-ingested) for the
+        current settings to apply. See docs/DEPLOYMENT.md.
+        """
+        info = await self.async_client.get_collection(collection_name)
+        vectors = info.config.params.vectors
+        mismatches = []
+        
+        # Vectors are normalized for DOT; a COSINE collection still ranks
+        # correctly but pays for a norm per comparison
+        if vectors.distance != Distance.DOT:
+            mismatches.append(f"distance {vectors.distance.value} != {Distance.DOT.value}")
+        
+        expected = self._vector_datatype() or models.Datatype.FLOAT32
+        actual = vectors.datatype or models.Datatype.FLOAT32
+        if actual != expected:
+            mismatches.append(f"datatype {actual.value} != {expected.value}")
+        
+        if bool(vectors.on_disk) != settings.qdrant_on_disk:
+            mismatches.append(f"on_disk {bool(vectors.on_disk)} != {settings.qdrant_on_disk}")
+        
+        hnsw = self._hnsw_config(collection_name)
+        if hnsw is not None:
+            for field_name in ("m", "payload_m"):
+                current = getattr(info.config.hnsw_config, field_name)
+                wanted = getattr(hnsw, field_name)
+                if current != wanted:
+                    mismatches.append(f"hnsw {field_name} {current} != {wanted}")
+        
+        quantized = info.config.quantization_config is not None
+        if quantized != settings.qdrant_scalar_quantization:
+            mismatches.append(
+                f"scalar quantization {quantized} != {settings.qdrant_scalar_quantization}"
+            )
+        
+        if mismatches:
+            logger.warning(
+                f"Collection {collection_name} does not match the configured vector settings "
+                f"({', '.join(mismatches)}); recreate it to apply them"
+            )
     
     async def init_collection(self, collection_name: str = None) -> bool:
         """
@@ -64,27 +297,39 @@ class QdrantVectorService:
                     collection_name=collection_name,
                     vectors_config=VectorParams(
                         size=self.embedding_dimension,
-                        distance=Distance.COSINE
-                    )
+                        # Vectors are unit-normalized before upsert and search,
+                        # so DOT equals cosine without per-comparison norms
+                        distance=Distance.DOT,
+                        datatype=self._vector_datatype(),
+                        on_disk=settings.qdrant_on_disk  # Originals on disk, quantized copies in RAM
+                    ),
+                    hnsw_config=self._hnsw_config(collection_name),
+                    quantization_config=self._quantization_config()
                 )
                 
-                # Create payload index for tenant isolation
+                # Create tenant payload index; is_tenant co-locates each
+                # tenant's points in storage so filtered searches read less
                 await self.async_client.create_payload_index(
                     collection_name=collection_name,
                     field_name="tenant_id",
-                    field_schema=models.PayloadSchemaType.KEYWORD
+                    field_schema=models.KeywordIndexParams(
+                        type=models.KeywordIndexType.KEYWORD,
+                        is_tenant=True
+                    )
                 )
                 
-                # Create additional indexes for efficient filtering
-                await self.async_client.create_payload_index(
-                    collection_name=collection_name,
-                    field_name="document_id",
-                    field_schema=models.PayloadSchemaType.KEYWORD
-                )
+                # Create additional indexes for every filterable payload field
+                for field_name, field_schema in self._index_fields().items():
+                    await self.async_client.create_payload_index(
+                        collection_name=collection_name,
+                        field_name=field_name,
+                        field_schema=field_schema
+                    )
                 
                 logger.info(f"Created Qdrant collection: {collection_name}")
             else:
                 logger.info(f"Collection {collection_name} already exists")
+                await self._check_collection_config(collection_name)
             
             return True
             
@@ -96,58 +341,326 @@ class QdrantVectorService:
         self,
         tenant_id: str,
         documents: List[Dict[str, Any]],
-        collection_name: str = None
+        collection_name: str = None,
+        batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        bulk_mode: bool = False
     ) -> bool:
         """
         Add documents to Qdrant with tenant isolation
         
+        Points are upserted in fixed-size batches, with up to max_concurrency
+        batches in flight at once.
+        
         Args:
             tenant_id: Tenant identifier for isolation
             documents: List of document dictionaries with text, embeddings, and metadata
             collection_name: Target collection name
+            batch_size: Points per upsert request
+            max_concurrency: Maximum concurrent upsert requests
+            bulk_mode: Pause HNSW indexing during the upload and build the
+                index once afterwards; intended for large ingests
+        
+        Documents may carry a content_hash; chunks whose point already stores
+        the same hash are skipped instead of being upserted again.
         """
-        if collection_name is None:
-            collection_name = self.default_collection
+        collection_name = await self._resolve_collection(tenant_id, collection_name)
+        documents = await self._skip_stored_chunks(tenant_id, documents, collection_name)
+        if batch_size is None:
+            batch_size = settings.qdrant_upsert_batch_size
+        if max_concurrency is None:
+            max_concurrency = settings.qdrant_upsert_concurrency
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def upsert_batch(batch: List[Dict[str, Any]], wait: bool = True) -> int:
+            # Points are built per batch so only in-flight batches are materialized
+            async with semaphore:
+                await self.async_client.upsert(
+                    collection_name=collection_name,
+                    points=self._build_batch(tenant_id, batch),
+                    wait=wait
+                )
+                return len(batch)
         
         try:
-            points = []
+            documents_iter = iter(documents)
+            batches = list(iter(lambda: list(islice(documents_iter, batch_size)), []))
             
-            for doc in documents:
-                point_id = str(uuid4())
-                
-                # Ensure tenant_id is in payload for isolation
-                payload = doc.get("metadata", {}).copy()
-                payload.update({
-                    "tenant_id": tenant_id,
-                    "document_id": doc.get("document_id"),
-                    "chunk_id": doc.get("chunk_id"),
-                    "text": doc.get("text", ""),
-                    "source": doc.get("source", ""),
-                    "page_number": doc.get("page_number"),
-                    "chunk_index": doc.get("chunk_index", 0)
-                })
-                
-                # Create point structure
-                point = PointStruct(
-                    id=point_id,
-                    vector=doc["embedding"],
-                    payload=payload
+            if bulk_mode:
+                await self._begin_bulk_upload(collection_name)
+            
+            try:
+                if bulk_mode and batches:
+                    # Queue all but the last batch without waiting; updates are
+                    # applied in order, so waiting on the last one covers them all
+                    results = await asyncio.gather(
+                        *[upsert_batch(batch, wait=False) for batch in batches[:-1]],
+                        return_exceptions=True
+                    )
+                    results.extend(await asyncio.gather(
+                        upsert_batch(batches[-1], wait=True),
+                        return_exceptions=True
+                    ))
+                else:
+                    results = await asyncio.gather(
+                        *[upsert_batch(batch) for batch in batches],
+                        return_exceptions=True
+                    )
+            finally:
+                if bulk_mode:
+                    await self._end_bulk_upload(collection_name)
+            
+            await self._invalidate_search_cache(tenant_id)
+            
+            failures = [r for r in results if isinstance(r, BaseException)]
+            if failures:
+                logger.error(
+                    f"Failed {len(failures)}/{len(results)} upsert batches for tenant {tenant_id}: {failures[0]}"
                 )
-                points.append(point)
+                return False
             
-            # Upsert points to Qdrant
-            operation_info = await self.async_client.upsert(
-                collection_name=collection_name,
-                points=points
-            )
+            for doc in documents:
+                if doc.get("content_hash"):
+                    _stored_hashes[self._stored_hash_key(collection_name, tenant_id, doc)] = doc["content_hash"]
             
-            logger.info(f"Added {len(points)} documents for tenant {tenant_id}")
+            logger.info(f"Added {sum(results)} documents for tenant {tenant_id}")
             return True
             
         except Exception as e:
             logger.error(f"Failed to add documents for tenant {tenant_id}: {e}")
             return False
     
+    def _stored_hash_key(
+        self,
+        collection_name: str,
+        tenant_id: str,
+        doc: Dict[str, Any]
+    ) -> Tuple[str, str, Optional[str], str]:
+        """
+        Key of a chunk in the stored content-hash cache
+        """
+        document_id = doc.get("document_id")
+        return (
+            collection_name, tenant_id, document_id,
+            self.point_id(tenant_id, document_id, doc.get("chunk_index", 0))
+        )
+    
+    async def _skip_stored_chunks(
+        self,
+        tenant_id: str,
+        documents: List[Dict[str, Any]],
+        collection_name: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Drop documents whose point already stores the same content_hash
+        
+        Known hashes come from the in-process cache; the rest are checked with
+        one scroll over the content_hash index. Documents without a hash are
+        always kept.
+        """
+        hashed = [
+            (doc, self._stored_hash_key(collection_name, tenant_id, doc))
+            for doc in documents if doc.get("content_hash")
+        ]
+        unknown = [(doc, key) for doc, key in hashed if _stored_hashes.get(key) != doc["content_hash"]]
+        
+        if unknown:
+            try:
+                points, _ = await self.async_client.scroll(
+                    collection_name=collection_name,
+                    scroll_filter=Filter(must=[
+                        _tenant_condition(tenant_id),
+                        FieldCondition(
+                            key="content_hash",
+                            match=models.MatchAny(any=list({doc["content_hash"] for doc, _ in unknown}))
+                        ),
+                        models.HasIdCondition(has_id=[key[3] for _, key in unknown])
+                    ]),
+                    limit=len(unknown),
+                    with_payload=["content_hash"],
+                    with_vectors=False
+                )
+                stored = {str(point.id): point.payload.get("content_hash") for point in points}
+                for doc, key in unknown:
+                    if stored.get(key[3]) == doc["content_hash"]:
+                        _stored_hashes[key] = doc["content_hash"]
+            except Exception as e:
+                # Deduplication is best-effort; fall back to upserting everything
+                logger.warning(f"Content hash lookup failed for tenant {tenant_id}: {e}")
+        
+        skipped = {
+            id(doc) for doc, key in hashed
+            if _stored_hashes.get(key) == doc["content_hash"]
+        }
+        if skipped:
+            logger.info(f"Skipping {len(skipped)} unchanged chunks for tenant {tenant_id}")
+            return [doc for doc in documents if id(doc) not in skipped]
+        return documents
+    
+    @staticmethod
+    def _forget_stored_hashes(predicate) -> None:
+        """
+        Drop stored content-hash entries whose key the predicate accepts
+        """
+        for key in [key for key in _stored_hashes if predicate(key)]:
+            _stored_hashes.pop(key, None)
+    
+    async def _set_indexing_threshold(self, collection_name: str, threshold: int) -> None:
+        """
+        Set the segment size (KB) above which Qdrant builds the HNSW index
+        """
+        await self.async_client.update_collection(
+            collection_name=collection_name,
+            optimizers_config=models.OptimizersConfigDiff(indexing_threshold=threshold)
+        )
+    
+    async def _begin_bulk_upload(self, collection_name: str) -> None:
+        """
+        Pause HNSW indexing for a bulk upload, remembering the threshold to restore
+        """
+        async with _bulk_uploads_lock:
+            state = _bulk_uploads.get(collection_name)
+            if state is not None:
+                state[0] += 1
+                return
+            
+            info = await self.async_client.get_collection(collection_name)
+            previous = info.config.optimizer_config.indexing_threshold
+            await self._set_indexing_threshold(collection_name, 0)
+            _bulk_uploads[collection_name] = [1, previous]
+    
+    async def _end_bulk_upload(self, collection_name: str) -> None:
+        """
+        Restore the previous indexing threshold once the last overlapping bulk upload ends
+        """
+        async with _bulk_uploads_lock:
+            state = _bulk_uploads[collection_name]
+            state[0] -= 1
+            if state[0] > 0:
+                return
+            
+            del _bulk_uploads[collection_name]
+            previous = state[1] if state[1] is not None else settings.qdrant_indexing_threshold
+            await self._set_indexing_threshold(collection_name, previous)
+    
+    @staticmethod
+    def point_id(tenant_id: str, document_id: str, chunk_index: int) -> str:
+        """
+        Deterministic point id for a chunk, making re-ingest an idempotent upsert
+        """
+        return str(uuid5(_POINT_ID_NAMESPACE, f"{tenant_id}:{document_id}:{chunk_index}"))
+    
+    @staticmethod
+    def _search_cache_generation_key(tenant_id: str) -> str:
+        """
+        Redis key of a tenant's search cache generation
+        """
+        return f"search_cache:generation:{tenant_id}"
+    
+    async def _search_cache_generation(self, tenant_id: str) -> Optional[int]:
+        """
+        Current search cache generation for a tenant, or None if Redis is unavailable
+        
+        The generation is part of every cache key, so bumping it in one worker
+        makes results cached by every other worker unreachable.
+        """
+        try:
+            generation = await self.redis_client.get(self._search_cache_generation_key(tenant_id))
+            return int(generation or 0)
+        except Exception as e:
+            logger.warning(f"Search cache generation unavailable for tenant {tenant_id}: {e}")
+            return None
+    
+    async def _invalidate_search_cache(self, tenant_id: str) -> None:
+        """
+        Drop cached search results for a tenant after its vectors change
+        """
+        _search_cache.invalidate_matching(lambda namespace: namespace[0] == tenant_id)
+        try:
+            await self.redis_client.incr(self._search_cache_generation_key(tenant_id))
+        except Exception as e:
+            logger.error(f"Failed to invalidate search cache for tenant {tenant_id}: {e}")
+    
+    @staticmethod
+    def _normalize(vectors: Any) -> np.ndarray:
+        """
+        L2-normalize a vector, or each row of a matrix, as float32
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+    
+    def _build_batch(
+        self,
+        tenant_id: str,
+        docs: List[Dict[str, Any]]
+    ) -> models.Batch:
+        """
+        Build a columnar Qdrant batch for document chunks
+        
+        Collections use DOT distance, so ndarray embeddings are L2-normalized
+        here. Plain list embeddings are passed through as-is and must already
+        be unit-normalized.
+        """
+        embeddings = [doc["embedding"] for doc in docs]
+        if all(isinstance(embedding, np.ndarray) for embedding in embeddings):
+            # Normalize and serialize the whole stacked batch in one call
+            vectors = self._normalize(np.stack(embeddings)).tolist()
+        else:
+            vectors = [
+                embedding.tolist() if isinstance(embedding, np.ndarray) else embedding
+                for embedding in embeddings
+            ]
+        
+        return models.Batch(
+            ids=[
+                self.point_id(tenant_id, doc.get("document_id"), doc.get("chunk_index", 0))
+                for doc in docs
+            ],
+            vectors=vectors,
+            payloads=[self._build_payload(tenant_id, doc) for doc in docs]
+        )
+    
+    def _build_payload(self, tenant_id: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the Qdrant payload for a document chunk
+        """
+        # Single merged dict; reserved keys (incl. tenant_id for isolation) win
+        return {
+            **(doc.get("metadata") or {}),
+            "tenant_id": tenant_id,
+            "document_id": doc.get("document_id"),
+            "chunk_id": doc.get("chunk_id"),
+            "text": doc.get("text", ""),
+            "source": doc.get("source", ""),
+            "page_number": doc.get("page_number"),
+            "chunk_index": doc.get("chunk_index", 0),
+            "content_hash": doc.get("content_hash")
+        }
+    
+    def _build_filter(
+        self,
+        tenant_id: str,
+        filter_conditions: Optional[Dict[str, Any]] = None
+    ) -> Filter:
+        """
+        Build a tenant-isolated filter with optional extra match conditions
+        """
+        must_conditions = [_tenant_condition(tenant_id)]
+        
+        # Add additional filter conditions
+        if filter_conditions:
+            for key, value in filter_conditions.items():
+                must_conditions.append(
+                    FieldCondition(
+                        key=key,
+                        match=MatchValue(value=value)
+                    )
+                )
+        
+        return Filter(must=must_conditions)
+    
     async def search_documents(
         self,
         tenant_id: str,
@@ -155,7 +668,8 @@ class QdrantVectorService:
         limit: int = 10,
         score_threshold: float = 0.7,
         filter_conditions: Optional[Dict[str, Any]] = None,
-        collection_name: str = None
+        collection_name: str = None,
+        hnsw_ef: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Search documents with tenant isolation
@@ -167,39 +681,38 @@ class QdrantVectorService:
             score_threshold: Minimum similarity score
             filter_conditions: Additional filter conditions
             collection_name: Target collection name
+            hnsw_ef: HNSW search width, defaults to max(128, 4 * limit)
         
         Returns:
             List of search results with metadata
         """
-        if collection_name is None:
-            collection_name = self.default_collection
+        collection_name = await self._resolve_collection(tenant_id, collection_name)
         
         try:
-            # Build filter for tenant isolation
-            must_conditions = [
-                FieldCondition(
-                    key="tenant_id",
-                    match=MatchValue(value=tenant_id)
-                )
-            ]
+            # Near-duplicate queries with the same parameters reuse cached results;
+            # without a generation other workers' invalidations can't be seen, so skip the cache
+            generation = await self._search_cache_generation(tenant_id)
+            cache_namespace = (
+                tenant_id, generation, collection_name, limit, score_threshold, hnsw_ef,
+                tuple(sorted((key, str(value)) for key, value in (filter_conditions or {}).items()))
+            )
             
-            # Add additional filter conditions
-            if filter_conditions:
-                for key, value in filter_conditions.items():
-                    must_conditions.append(
-                        FieldCondition(
-                            key=key,
-                            match=MatchValue(value=value)
-                        )
-                    )
+            cached = None if generation is None else _search_cache.get(cache_namespace, query_embedding)
+            if cached is not None:
+                # Results are cached as a tuple; callers get their own copies of the result dicts
+                logger.debug(f"Search cache hit for tenant {tenant_id}: {_search_cache.stats()}")
+                return [dict(result) for result in cached]
             
-            search_filter = Filter(must=must_conditions)
+            # Build filter for tenant isolation
+            search_filter = self._build_filter(tenant_id, filter_conditions)
             
             # Perform search with tenant isolation
             search_results = await self.async_client.search(
                 collection_name=collection_name,
-                query_vector=query_embedding,
+                query_vector=self._normalize(query_embedding).tolist(),
                 query_filter=search_filter,
+                search_params=self._search_params(limit, hnsw_ef),
+                timeout=settings.qdrant_search_timeout,
                 limit=limit,
                 score_threshold=score_threshold,
                 with_payload=True,
@@ -207,22 +720,10 @@ class QdrantVectorService:
             )
             
             # Format results
-            results = []
-            for result in search_results:
-                results.append({
-                    "id": result.id,
-                    "score": result.score,
-                    "text": result.payload.get("text", ""),
-                    "document_id": result.payload.get("document_id"),
-                    "chunk_id": result.payload.get("chunk_id"),
-                    "source": result.payload.get("source", ""),
-                    "page_number": result.payload.get("page_number"),
-                    "chunk_index": result.payload.get("chunk_index", 0),
-                    "metadata": {
-                        k: v for k, v in result.payload.items() 
-                        if k not in ["tenant_id", "text", "document_id", "chunk_id", "source"]
-                    }
-                })
+            results = [self._format_result(result) for result in search_results]
+            
+            if generation is not None:
+                _search_cache.set(cache_namespace, query_embedding, tuple(dict(result) for result in results))
             
             logger.info(f"Found {len(results)} documents for tenant {tenant_id}")
             return results
@@ -231,6 +732,86 @@ class QdrantVectorService:
             logger.error(f"Search failed for tenant {tenant_id}: {e}")
             return []
     
+    async def search_documents_batch(
+        self,
+        tenant_id: str,
+        query_embeddings: List[List[float]],
+        limit: int = 10,
+        score_threshold: float = 0.7,
+        filter_conditions: Optional[Dict[str, Any]] = None,
+        collection_name: str = None,
+        hnsw_ef: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run several searches for one tenant in a single request
+        
+        Useful for multi-query retrieval, where each query embedding would
+        otherwise cost its own round trip.
+        
+        Returns:
+            One list of search results per query embedding, in order
+        """
+        collection_name = await self._resolve_collection(tenant_id, collection_name)
+        
+        try:
+            # All queries share the tenant-isolated filter and search params
+            search_filter = self._build_filter(tenant_id, filter_conditions)
+            search_params = self._search_params(limit, hnsw_ef)
+            
+            requests = [
+                models.SearchRequest(
+                    vector=vector,
+                    filter=search_filter,
+                    params=search_params,
+                    limit=limit,
+                    score_threshold=score_threshold,
+                    with_payload=True,
+                    with_vector=False
+                )
+                for vector in self._normalize(query_embeddings).tolist()
+            ]
+            
+            batch_results = await self.async_client.search_batch(
+                collection_name=collection_name,
+                requests=requests,
+                timeout=settings.qdrant_search_timeout
+            )
+            
+            results = [
+                [self._format_result(result) for result in search_results]
+                for search_results in batch_results
+            ]
+            
+            logger.info(f"Ran {len(requests)} batched searches for tenant {tenant_id}")
+            return results
+        
+        except Exception as e:
+            logger.error(f"Batch search failed for tenant {tenant_id}: {e}")
+            return [[] for _ in query_embeddings]
+    
+    @staticmethod
+    def _format_result(result: models.ScoredPoint) -> Dict[str, Any]:
+        """
+        Format a scored point as a search result dictionary
+        
+        Reserved keys are popped from one shallow copy of the payload, and
+        what remains becomes the metadata.
+        """
+        metadata = dict(result.payload)
+        metadata.pop("tenant_id", None)
+        metadata.pop("content_hash", None)
+        return {
+            "id": result.id,
+            "score": result.score,
+            "text": metadata.pop("text", ""),
+            "document_id": metadata.pop("document_id", None),
+            "chunk_id": metadata.pop("chunk_id", None),
+            "source": metadata.pop("source", ""),
+            "page_number": metadata.get("page_number"),
+            "chunk_index": metadata.get("chunk_index", 0),
+            "metadata": metadata
+        }
+    
     async def delete_document(
         self,
         tenant_id: str,
@@ -240,46 +821,24 @@ class QdrantVectorService:
         """
         Delete all chunks of a document for a specific tenant
         """
-        if collection_name is None:
-            collection_name = self.default_collection
+        collection_name = await self._resolve_collection(tenant_id, collection_name)
         
         try:
-            # Find all points for this document and tenant
-            search_filter = Filter(
-                must=[
-                    FieldCondition(
-                        key="tenant_id",
-                        match=MatchValue(value=tenant_id)
-                    ),
-                    FieldCondition(
-                        key="document_id",
-                        match=MatchValue(value=document_id)
-                    )
-                ]
-            )
+            # Match all points for this document and tenant
+            search_filter = self._build_filter(tenant_id, {"document_id": document_id})
             
-            # Get points to delete
-            scroll_result = await self.async_client.scroll(
+            # Delete matching points server-side via the payload indexes
+            await self.async_client.delete(
                 collection_name=collection_name,
-                scroll_filter=search_filter,
-                limit=1000,  # Adjust based on your needs
-                with_payload=False,
-                with_vectors=False
+                points_selector=models.FilterSelector(filter=search_filter)
             )
             
-            if scroll_result[0]:  # If points found
-                point_ids = [point.id for point in scroll_result[0]]
-                
-                # Delete points
-                await self.async_client.delete(
-                    collection_name=collection_name,
-                    points_selector=models.PointIdsList(
-                        points=point_ids
-                    )
-                )
-                
-                logger.info(f"Deleted {len(point_ids)} chunks for document {document_id} in tenant {tenant_id}")
+            await self._invalidate_search_cache(tenant_id)
+            self._forget_stored_hashes(
+                lambda key: key[:3] == (collection_name, tenant_id, document_id)
+            )
             
+            logger.info(f"Deleted chunks for document {document_id} in tenant {tenant_id}")
             return True
             
         except Exception as e:
@@ -295,23 +854,29 @@ class QdrantVectorService:
         Delete all data for a specific tenant (use with caution!)
         """
         if collection_name is None:
-            collection_name = self.default_collection
+            collection_name = self.collection_for_tenant(tenant_id)
+        
+        # In per-tenant mode the tenant owns the whole collection
+        owns_collection = collection_name == self.collection_for_tenant(tenant_id) != self.default_collection
         
         try:
-            # Delete all points for this tenant
-            await self.async_client.delete(
-                collection_name=collection_name,
-                points_selector=Filter(
-                    must=[
-                        FieldCondition(
-                            key="tenant_id",
-                            match=MatchValue(value=tenant_id)
-                        )
-                    ]
+            if owns_collection:
+                # Dropping the collection is O(1) compared to a filtered delete
+                await self.async_client.delete_collection(collection_name)
+                _tenant_collections.pop(collection_name, None)
+            else:
+                # Delete all points for this tenant; large tenants can take longer
+                # than the client timeout, so return once the operation is queued
+                await self.async_client.delete(
+                    collection_name=collection_name,
+                    wait=False,
+                    points_selector=self._build_filter(tenant_id)
                 )
-            )
             
-            logger.warning(f"Deleted all data for tenant {tenant_id}")
+            await self._invalidate_search_cache(tenant_id)
+            self._forget_stored_hashes(lambda key: key[:2] == (collection_name, tenant_id))
+            
+            logger.warning(f"Deleting all data for tenant {tenant_id}")
             return True
             
         except Exception as e:
@@ -341,6 +906,16 @@ class QdrantVectorService:
             logger.error(f"Failed to get collection info for {collection_name}: {e}")
             return None
     
+    @staticmethod
+    async def close() -> None:
+        """
+        Close the shared Qdrant client
+        """
+        global _async_client
+        if _async_client is not None:
+            await _async_client.close()
+            _async_client = None
+    
     async def health_check(self) -> bool:
         """
         Check if Qdrant service is healthy
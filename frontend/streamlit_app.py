@@ -3,17 +3,45 @@ Streamlit frontend for Multi-Tenant RAG System
 A simple, detachable frontend interface for testing the RAG system
 """
 import streamlit as st
-import requests
-import json
+import httpx
+import orjson
+import atexit
+import re
+import shutil
+import tempfile
 import time
-from typing import Dict, List, Optional
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional
 from datetime import datetime
-import io
+from pathlib import Path
 
 # Configuration
 import os
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000/api/v1")
 
+# Streamed text is flushed to the page at most this often, or once this many deltas queue up
+STREAM_FLUSH_INTERVAL = 0.05
+STREAM_FLUSH_DELTAS = 32
+
+# Most recent chat messages rendered on every rerun
+CHAT_HISTORY_WINDOW = 10
+
+# Characters of each response the history listing loads; the rest is fetched on request
+HISTORY_PREVIEW_CHARS = 500
+
+# Documents listed per page of the documents table
+DOCUMENTS_PAGE_SIZE = 20
+
+# Sidebar pages; the current one is mirrored in the ?page= query parameter
+PAGES = ("Chat", "Documents", "History")
+
+# Chat messages kept in session state; older ones are spilled to a per-session file
+CHAT_HISTORY_LIMIT = 50
+
+# Spill files not written to for this long belong to expired sessions and are removed
+CHAT_SPILL_MAX_AGE = 24 * 3600
+    
     # Page configuration
 st.set_page_config(
     page_title="Multi-Tenant RAG System",
@@ -21,431 +49,159 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+
 # Custom CSS
-st.markdown("""
-<style>
-/* Main layout improvements */
-.main > div {
-    padding-top: 2rem;
-}
-.stAlert {
-    margin-top: 1rem;
-}
-
-/* Sidebar styling */
-.css-1d391kg {
-    background-color: #1e2937;
-}
-
-/* Section headers in sidebar */
-.sidebar-section {
-    color: #f9fafb;
-    padding: 8px 0;
-    margin: 20px 0 10px 0;
-    font-weight: 600;
-    font-size: 14px;
-    text-transform: uppercase;
-    letter-spacing: 0.5px;
-    border-bottom: 2px solid #4b5563;
-}
-
-/* User and organization info styling */
-.info-card {
-    background-color: #374151;
-    border: 1px solid #4b5563;
-    border-radius: 8px;
-    padding: 16px;
-    margin: 10px 0;
-    color: #f3f4f6;
-}
-
-.info-label {
-    color: #9ca3af;
-    font-size: 12px;
-    font-weight: 500;
-    text-transform: uppercase;
-    letter-spacing: 0.05em;
-    margin-bottom: 4px;
-}
-
-.info-value {
-    color: #f9fafb;
-    font-weight: 600;
-    font-size: 14px;
-    margin-bottom: 12px;
-}
-
-/* Navigation styling */
-.nav-container {
-    padding: 10px 0;
-    margin: 15px 0;
-}
-
-/* Navigation buttons */
-.nav-button {
-    margin: 5px 0;
-}
-
-.nav-button button {
-    width: 100%;
-    background-color: #374151 !important;
-    color: #f9fafb !important;
-    border: 1px solid #4b5563 !important;
-    border-radius: 8px !important;
-    padding: 12px 16px !important;
-    font-weight: 500 !important;
-    text-align: left !important;
-    transition: all 0.3s ease !important;
-}
-
-.nav-button button:hover {
-    background-color: #4b5563 !important;
-    border-color: #6b7280 !important;
-    transform: translateX(4px) !important;
-}
-
-.nav-button.active button {
-    background-color: #3b82f6 !important;
-    border-color: #2563eb !important;
-    color: white !important;
-    font-weight: 600 !important;
-}
-
-/* Default button styling */
-.stButton > button {
-    background-color: #f3f4f6;
-    color: #374151;
-    border: 1px solid #d1d5db;
-    border-radius: 6px;
-    padding: 8px 16px;
-    font-weight: 500;
-    transition: all 0.2s ease;
-}
-
-.stButton > button:hover {
-    background-color: #e5e7eb;
-    border-color: #9ca3af;
-}
-
-/* Primary button styling */
-.primary-button button {
-    background-color: #3b82f6 !important;
-    color: white !important;
-    border: 1px solid #2563eb !important;
-}
-
-.primary-button button:hover {
-    background-color: #2563eb !important;
-    border-color: #1d4ed8 !important;
-}
-
-/* Form submit button styling */
-.stForm button[kind="primary"] {
-    background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%) !important;
-    color: white !important;
-    border: none !important;
-    border-radius: 10px !important;
-    padding: 14px 28px !important;
-    font-weight: 600 !important;
-    font-size: 16px !important;
-    text-transform: uppercase !important;
-    letter-spacing: 0.5px !important;
-    transition: all 0.3s ease !important;
-    box-shadow: 0 4px 12px rgba(59, 130, 246, 0.3) !important;
-}
-
-.stForm button[kind="primary"]:hover {
-    background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%) !important;
-    transform: translateY(-2px) !important;
-    box-shadow: 0 6px 16px rgba(59, 130, 246, 0.4) !important;
-}
-
-.stForm button[kind="secondary"], .stForm button:not([kind]) {
-    background: linear-gradient(135deg, #6b7280 0%, #4b5563 100%) !important;
-    color: white !important;
-    border: none !important;
-    border-radius: 10px !important;
-    padding: 14px 28px !important;
-    font-weight: 600 !important;
-    font-size: 16px !important;
-    text-transform: uppercase !important;
-    letter-spacing: 0.5px !important;
-    transition: all 0.3s ease !important;
-    box-shadow: 0 4px 12px rgba(107, 114, 128, 0.3) !important;
-}
-
-.stForm button[kind="secondary"]:hover, .stForm button:not([kind]):hover {
-    background: linear-gradient(135deg, #4b5563 0%, #374151 100%) !important;
-    transform: translateY(-2px) !important;
-    box-shadow: 0 6px 16px rgba(107, 114, 128, 0.4) !important;
-}
-
-/* Logout button special styling */
-.logout-btn button {
-    background: linear-gradient(135deg, #dc2626 0%, #b91c1c 100%) !important;
-    color: white !important;
-    border-radius: 8px !important;
-    font-weight: 600 !important;
-    transition: all 0.3s ease !important;
-}
-
-.logout-btn button:hover {
-    background: linear-gradient(135deg, #b91c1c 0%, #991b1b 100%) !important;
-    transform: translateY(-1px) !important;
-}
-
-/* Upload section */
-.upload-section {
-    border: 2px dashed #6366f1;
-    border-radius: 12px;
-    padding: 20px;
-    margin: 10px 0;
-    text-align: center;
-    background: linear-gradient(135deg, #f8fafc 0%, #f1f5f9 100%);
-    transition: all 0.3s ease;
-}
-
-.upload-section:hover {
-    border-color: #4f46e5;
-    background: linear-gradient(135deg, #f1f5f9 0%, #e2e8f0 100%);
-}
-
-/* Query response styling */
-.query-response {
-    background: linear-gradient(135deg, #f8fafc 0%, #f1f5f9 100%);
-    padding: 20px;
-    border-radius: 12px;
-    margin: 10px 0;
-    border: 1px solid #e2e8f0;
-    box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-}
-
-/* Context documents styling */
-.context-doc {
-    background: linear-gradient(135deg, #1f2937 0%, #374151 100%);
-    color: #f7fafc;
-    padding: 18px;
-    border-radius: 10px;
-    margin: 10px 0;
-    border-left: 4px solid #3b82f6;
-    border: 1px solid #4b5563;
-    box-shadow: 0 2px 6px rgba(0,0,0,0.1);
-    transition: all 0.3s ease;
-}
-
-.context-doc:hover {
-    transform: translateY(-2px);
-    box-shadow: 0 4px 12px rgba(0,0,0,0.15);
-}
-
-.context-doc strong {
-    color: #60a5fa;
-    font-weight: 600;
-}
-
-.context-doc em {
-    color: #cbd5e1;
-}
-
-/* Metrics styling */
-.metric-card {
-    background: linear-gradient(135deg, #f3f4f6 0%, #e5e7eb 100%);
-    padding: 16px;
-    border-radius: 8px;
-    text-align: center;
-    border: 1px solid #d1d5db;
-}
-
-/* Radio button styling */
-.stRadio > div {
-    background-color: transparent;
-}
-
-/* Divider styling */
-hr {
-    border: none;
-    height: 2px;
-    background: linear-gradient(to right, transparent, #4b5563, transparent);
-    margin: 20px 0;
-}
-
-/* Tab styling */
-.stTabs [data-baseweb="tab-list"] {
-    gap: 16px;
-    justify-content: center;
-    margin-bottom: 32px;
-}
-
-.stTabs [data-baseweb="tab"] {
-    background: rgba(55, 65, 81, 0.8);
-    color: #d1d5db;
-    border-radius: 12px;
-    border: none;
-    padding: 14px 28px;
-    font-weight: 600;
-    font-size: 14px;
-    text-transform: uppercase;
-    letter-spacing: 0.5px;
-    transition: all 0.3s ease;
-    box-shadow: 0 4px 12px rgba(0, 0, 0, 0.2);
-    backdrop-filter: blur(10px);
-    outline: none;
-}
-
-.stTabs [data-baseweb="tab"]:hover {
-    background: rgba(75, 85, 99, 0.9);
-    transform: translateY(-2px);
-    box-shadow: 0 6px 16px rgba(0, 0, 0, 0.25);
-}
-
-.stTabs [aria-selected="true"] {
-    background: #555555;
-    color: white;
-    transform: translateY(-1px);
-}
-
-
-
-
-/* Clean Form Container */
-.stForm {
-    background: rgba(31, 41, 55, 0.95);
-    border: 1px solid rgba(55, 65, 81, 0.8);
-    border-radius: 12px;
-    padding: 28px;
-    box-shadow: 0 4px 20px rgba(0, 0, 0, 0.15);
-    backdrop-filter: blur(8px);
-}
-
-/* Universal Input Styling - All Fields Same */
-.stTextInput > div > div > input,
-.stTextArea > div > div > textarea,
-.stSelectbox > div > div {
-    background-color: #374151 !important;
-    border: 1px solid #4b5563 !important;
-    border-radius: 8px !important;
-    color: #f9fafb !important;
-    padding: 12px 16px !important;
-    font-size: 14px !important;
-    transition: all 0.2s ease !important;
-    outline: none !important;
-    width: 100% !important;
-    box-sizing: border-box !important;
-    height: 40px !important;
-    line-height: 1.5 !important;
-}
-
-/* Focus States - All Fields Same */
-.stTextInput > div > div > input:focus,
-.stTextArea > div > div > textarea:focus,
-.stSelectbox > div > div:focus {
-    border-color: #3b82f6 !important;
-    box-shadow: 0 0 0 3px rgba(59, 130, 246, 0.1) !important;
-    background-color: #374151 !important;
-}
-
-/* Hover States - All Fields Same */
-.stTextInput > div > div > input:hover,
-.stTextArea > div > div > textarea:hover,
-.stSelectbox > div > div:hover {
-    border-color: #6b7280 !important;
-    background-color: #374151 !important;
-}
-
-/* Textarea Special Height */
-.stTextArea > div > div > textarea {
-    height: 80px !important;
-    resize: vertical !important;
-}
-
-/* Selectbox Inner Content */
-.stSelectbox > div > div > div {
-    background: transparent !important;
-    border: none !important;
-    color: #f9fafb !important;
-    padding: 0 !important;
-    height: auto !important;
-    line-height: inherit !important;
-}
-
-/* Labels Consistent */
-.stTextInput label,
-.stTextArea label,
-.stSelectbox label {
-    color: #d1d5db !important;
-    font-weight: 500 !important;
-    font-size: 14px !important;
-    margin-bottom: 6px !important;
-}
-
-/* Completely hide password reveal button */
-.stTextInput button {
-    display: none !important;
-}
-
-/* Container Uniformity */
-.stTextInput,
-.stTextArea,
-.stSelectbox {
-    margin-bottom: 16px !important;
-}
-
-.stTextInput > div,
-.stTextArea > div,
-.stSelectbox > div {
-    width: 100% !important;
-}
-
-/* Dropdown Arrow */
-.stSelectbox svg {
-    color: #9ca3af !important;
-}
-
-/* Remove all default outlines */
-* {
-    outline: none !important;
-}
-
-*:focus {
-    outline: none !important;
-}
-
-/* Delete button styling */
-.delete-btn button {
-    background: linear-gradient(135deg, #ef4444 0%, #dc2626 100%) !important;
-    color: white !important;
-    border: none !important;
-    border-radius: 8px !important;
-    font-weight: 600 !important;
-    transition: all 0.3s ease !important;
-    padding: 8px 16px !important;
-}
-
-.delete-btn button:hover {
-    background: linear-gradient(135deg, #dc2626 0%, #b91c1c 100%) !important;
-    transform: translateY(-1px) !important;
-    box-shadow: 0 4px 12px rgba(239, 68, 68, 0.4) !important;
-}
-
-/* Actions section */
-.actions-section {
-    padding-left: 8px;
-}
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource
+def load_css() -> str:
+    """Read and minify the stylesheet once per process"""
+    css = (Path(__file__).parent / "static" / "app.css").read_text()
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    return re.sub(r"\s+", " ", css).strip()
+
+
+st.markdown(f"<style>{load_css()}</style>", unsafe_allow_html=True)
+
+
+def _loads(response: httpx.Response) -> Any:
+    """Decode a JSON response body with orjson"""
+    return orjson.loads(response.content)
+
+
+def _json_body(data: Dict) -> Dict:
+    """Request kwargs sending data as an orjson-encoded body"""
+    return {"content": orjson.dumps(data), "headers": {"Content-Type": "application/json"}}
+
+
+@st.cache_data(ttl=60, max_entries=256, show_spinner=False)
+def _cached_get(_client: "APIClient", token: str, generation: int, path: str, params: Optional[Dict] = None) -> Dict:
+    """GET through the client; the bearer token keys entries so tenants never share them,
+    and the client's cache generation lets a session drop only its own entries"""
+    response = _client.get_with_retry(path, params=params)
+    APIClient.raise_for(response)
+    return _loads(response)
+
+
+@st.cache_resource
+def _shared_transport() -> httpx.HTTPTransport:
+    """Keep-alive pool shared by every session's client, so reruns and new sessions reuse connections"""
+    # HTTP/2 multiplexes concurrent calls over one connection where the server negotiates it
+    return httpx.HTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+        retries=3  # Connection failures only
+    )
+
+
+@st.cache_resource
+def _chat_spill_dir() -> Path:
+    """Private (0700) directory for this process's chat spill files, removed at exit"""
+    path = Path(tempfile.mkdtemp(prefix="rag_chat_"))
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+
+@st.cache_resource
+def _shared_pool() -> ThreadPoolExecutor:
+    """Worker threads for APIClient.gather, created once per process rather than per session"""
+    return ThreadPoolExecutor(max_workers=8)
+
+
+class ProgressReader:
+    """File wrapper reporting the fraction read so far, as httpx pulls upload chunks"""
+    
+    def __init__(self, file_obj: BinaryIO, total: int, on_progress: Callable[[float], None]):
+        self._file = file_obj
+        self._total = max(total, 1)
+        self._on_progress = on_progress
+    
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._file.read(size)
+        self._on_progress(min(self._file.tell() / self._total, 1.0))
+        return chunk
+    
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._file.seek(offset, whence)
+    
+    def tell(self) -> int:
+        return self._file.tell()
+
+
+class APIError(Exception):
+    """Error response from the API, carrying the server's detail message"""
+    
+    def __init__(self, detail: str, status_code: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
 
 
 class APIClient:
     """Simple API client for the RAG system"""
     
+    # Gateway errors worth retrying for idempotent GETs
+    RETRY_STATUSES = {502, 503, 504}
+    
     def __init__(self, base_url: str):
         self.base_url = base_url
-        self.session = requests.Session()
+        
+        # Per-session headers (auth) over the process-wide connection pool
+        self.session = httpx.Client(
+            base_url=base_url,
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            transport=_shared_transport()
+        )
+        
+        # Part of every cached GET's key; bumped to invalidate this session's entries only
+        self.cache_generation = 0
     
     def set_auth_token(self, token: str):
         """Set authentication token"""
         self.session.headers.update({"Authorization": f"Bearer {token}"})
     
+    def clear_auth_token(self):
+        """Clear authentication token, keeping pooled connections"""
+        self.session.headers.pop("Authorization", None)
+    
+    @property
+    def auth_token(self) -> Optional[str]:
+        """Current Authorization header, used as the cache key seed"""
+        return self.session.headers.get("Authorization")
+    
+    @staticmethod
+    def raise_for(response: httpx.Response):
+        """Raise APIError with the server's detail message for non-2xx responses"""
+        if response.is_success:
+            return
+        
+        response.read()  # No-op unless the body is still being streamed
+        body = response.content
+        detail = None
+        if body[:1] == b"{":
+            try:
+                detail = orjson.loads(body).get("detail")
+            except orjson.JSONDecodeError:
+                pass
+        if detail is None:
+            detail = body[:2048].decode("utf-8", "replace") or response.reason_phrase
+        
+        raise APIError(str(detail), response.status_code)
+    
+    def get_with_retry(self, path: str, params: Optional[Dict] = None, attempts: int = 3) -> httpx.Response:
+        """GET with a short backoff on gateway errors"""
+        for attempt in range(attempts):
+            response = self.session.get(path, params=params)
+            if response.status_code not in self.RETRY_STATUSES or attempt == attempts - 1:
+                return response
+            time.sleep(0.2 * 2 ** attempt)
+    
+    def invalidate_cache(self):
+        """Stop using this session's cached GET results after a write; other sessions keep theirs"""
+        self.cache_generation += 1
+    
+    def cached_get(self, path: str, params: Optional[Dict] = None) -> Dict:
+        """GET with results cached per token and cache generation"""
+        return _cached_get(self, self.auth_token, self.cache_generation, path, params)
+    
     def login(self, email: str, password: str, tenant_identifier: str = None) -> Dict:
         """Login user"""
         data = {
@@ -453,9 +209,9 @@ class APIClient:
             "password": password,
             "tenant_identifier": tenant_identifier
         }
-        response = self.session.post(f"{self.base_url}/auth/login", json=data)
-        response.raise_for_status()
-        return response.json()
+        response = self.session.post("/auth/login", **_json_body(data))
+        self.raise_for(response)
+        return _loads(response)
     
     def signup(self, organization_name: str, admin_email: str, admin_username: str, 
                admin_password: str, subdomain: str = None, llm_provider: str = "openai", 
@@ -470,30 +226,33 @@ class APIClient:
             "llm_provider": llm_provider,
             "llm_model": llm_model
         }
-        response = self.session.post(f"{self.base_url}/auth/signup", json=data)
-        response.raise_for_status()
-        return response.json()
+        response = self.session.post("/auth/signup", **_json_body(data))
+        self.raise_for(response)
+        return _loads(response)
     
-    def upload_document(self, file_data: bytes, filename: str, metadata: Dict = None) -> Dict:
-        """Upload document"""
-        files = {"file": (filename, io.BytesIO(file_data), "application/octet-stream")}
+    def upload_document(self, file_obj: BinaryIO, filename: str, metadata: Dict = None,
+                        content_type: str = None) -> Dict:
+        """Upload document, streaming the file handle in chunks"""
+        files = {"file": (filename, file_obj, content_type or "application/octet-stream")}
         data = {}
         if metadata:
-            data["metadata"] = json.dumps(metadata)
+            data["metadata"] = orjson.dumps(metadata).decode()
         
-        response = self.session.post(f"{self.base_url}/documents/upload", files=files, data=data)
-        response.raise_for_status()
-        return response.json()
+        # httpx reads file fields lazily while sending instead of building the body in memory
+        response = self.session.post("/documents/upload", files=files, data=data)
+        self.raise_for(response)
+        self.invalidate_cache()
+        return _loads(response)
     
-    def list_documents(self, skip: int = 0, limit: int = 20) -> Dict:
+    def list_documents(self, skip: int = 0, limit: int = 20, status_filter: str = None) -> Dict:
         """List documents"""
         params = {"skip": skip, "limit": limit}
-        response = self.session.get(f"{self.base_url}/documents/", params=params)
-        response.raise_for_status()
-        return response.json()
+        if status_filter:
+            params["status_filter"] = status_filter
+        return self.cached_get("/documents/", params)
     
-    def rag_query(self, query: str, max_chunks: int = 5, stream: bool = False, **kwargs) -> Dict:
-        """Submit RAG query"""
+    def rag_query(self, query: str, max_chunks: int = 5, stream: bool = False, **kwargs):
+        """Submit RAG query; with stream=True, returns an iterator of SSE events"""
         data = {
             "query": query,
             "max_chunks": max_chunks,
@@ -502,65 +261,155 @@ class APIClient:
         }
         
         if stream:
-            response = self.session.post(f"{self.base_url}/queries/rag/stream", json=data, stream=True)
-        else:
-            response = self.session.post(f"{self.base_url}/queries/rag", json=data)
+            return self._stream_rag_query(data)
         
-        response.raise_for_status()
-        return response.json() if not stream else response
+        # The query is recorded in history
+        self.invalidate_cache()
+        response = self.session.post("/queries/rag", **_json_body(data))
+        self.raise_for(response)
+        return _loads(response)
+    
+    def _stream_rag_query(self, data: Dict) -> Iterator[Dict]:
+        """Yield {"delta": ...} events, and a leading {"context_documents": [...]}, from the streaming RAG endpoint"""
+        with self.session.stream("POST", "/queries/rag/stream", **_json_body(data)) as response:
+            self.raise_for(response)
+            
+            for line in response.iter_lines():
+                if not line or not line.startswith("data:"):
+                    continue
+                
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    break
+                
+                event = orjson.loads(payload)
+                if "error" in event:
+                    raise Exception(event["error"])
+                
+                yield event
+        
+        # The server records the streamed query in history before sending [DONE]
+        self.invalidate_cache()
     
     def debug_vector_status(self) -> Dict:
         """Check vector store status (debug)"""
-        response = self.session.get(f"{self.base_url}/queries/debug/vector-status")
-        response.raise_for_status()
-        return response.json()
+        response = self.get_with_retry("/queries/debug/vector-status")
+        self.raise_for(response)
+        return _loads(response)
     
-    def get_query_history(self, skip: int = 0, limit: int = 10) -> Dict:
-        """Get query history"""
-        params = {"skip": skip, "limit": limit}
-        response = self.session.get(f"{self.base_url}/queries/history", params=params)
-        response.raise_for_status()
-        return response.json()
+    def get_query_history(self, skip: int = 0, limit: int = 10, cursor: str = None,
+                          preview_chars: int = HISTORY_PREVIEW_CHARS) -> Dict:
+        """Get query history; pass a page's next_cursor to continue after it"""
+        params = {"limit": limit, "cursor": cursor} if cursor else {"skip": skip, "limit": limit}
+        params["preview_chars"] = preview_chars
+        return self.cached_get("/queries/history", params)
+    
+    def get_query(self, query_id: str) -> Dict:
+        """Get a query with its full response"""
+        return self.cached_get(f"/queries/{query_id}")
+    
+    def get_query_history_stats(self) -> Dict:
+        """Get aggregate statistics over the query history"""
+        return self.cached_get("/queries/history/stats")
     
     def get_tenant_info(self) -> Dict:
         """Get current tenant info"""
-        response = self.session.get(f"{self.base_url}/tenant/info")
-        response.raise_for_status()
-        return response.json()
+        return self.cached_get("/tenant/info")
+    
+    def gather(self, *calls: Callable[[], Any], return_exceptions: bool = False) -> List[Any]:
+        """Run independent calls concurrently over the pooled session, results in order"""
+        pool = _shared_pool()
+        futures = [pool.submit(call) for call in calls]
+        if not return_exceptions:
+            return [future.result() for future in futures]
+        return [future.exception() or future.result() for future in futures]
+    
+    def get_dashboard(self) -> Dict:
+        """Get tenant info, documents and query history in one call"""
+        return self.cached_get("/dashboard")
     
     def delete_document(self, document_id: str) -> Dict:
         """Delete document by ID"""
         try:
-            response = self.session.delete(f"{self.base_url}/documents/{document_id}")
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
-                raise Exception("Document not found")
-            elif e.response.status_code == 403:
-                raise Exception("Permission denied")
-            else:
-                raise Exception(f"HTTP {e.response.status_code}: {e.response.text}")
-        except requests.exceptions.RequestException as e:
+            response = self.session.delete(f"/documents/{document_id}")
+        except httpx.RequestError as e:
             raise Exception(f"Connection error: {str(e)}")
+        
+        self.raise_for(response)
+        self.invalidate_cache()
+        return _loads(response)
 
 
 def initialize_session_state():
     """Initialize Streamlit session state"""
-    if "api_client" not in st.session_state:
-        st.session_state.api_client = APIClient(API_BASE_URL)
+    ss = st.session_state
     
-    if "authenticated" not in st.session_state:
-        st.session_state.authenticated = False
+    # Not setdefault: the client would be built, and discarded, on every rerun
+    if "api_client" not in ss:
+        ss.api_client = APIClient(API_BASE_URL)
     
-    if "user_info" not in st.session_state:
-        st.session_state.user_info = None
+    ss.setdefault("authenticated", False)
+    ss.setdefault("user_info", None)
+    ss.setdefault("tenant_info", None)
+    ss.setdefault("chat_history", [])
+    ss.setdefault("upload_nonce", 0)
     
-    if "tenant_info" not in st.session_state:
-        st.session_state.tenant_info = None
+    if "current_page" not in ss:
+        page = st.query_params.get("page")
+        ss.current_page = page if page in PAGES else "Chat"
+
+
+def navigate(page: str):
+    """Navigation button callback; runs before the rerun the click triggers"""
+    st.session_state.current_page = page
+    st.query_params["page"] = page
+
+
+def page_operations(client: APIClient, page: str) -> List[tuple]:
+    """Direct reads a page needs, as (key, call)"""
+    operations = [("tenant", client.get_tenant_info)]
+    if page == "Documents":
+        operations.append(("documents", client.list_documents))
+    elif page == "History":
+        operations.append(("history", lambda: client.get_query_history(limit=20)))
+        operations.append(("history_stats", client.get_query_history_stats))
+    return operations
+
+
+def prefetch_pages(client: APIClient):
+    """Warm the dashboard cache used by the Documents and History pages, best effort"""
+    try:
+        client.get_dashboard()
+    except (APIError, httpx.HTTPError):
+        pass
+
+
+def load_page_data(page: str) -> Dict[str, Dict]:
+    """Fetch tenant info, documents and query history in one dashboard call"""
+    client = st.session_state.api_client
+    
+    try:
+        page_data = client.get_dashboard()
+    except (APIError, httpx.HTTPError):
+        # Without the dashboard endpoint, overlap the page's direct calls instead
+        operations = page_operations(client, page)
+        values = client.gather(*[call for _, call in operations], return_exceptions=True)
+        page_data = {
+            key: value
+            for (key, _), value in zip(operations, values)
+            if not isinstance(value, BaseException)
+        }
     
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
+    if "tenant" in page_data:
+        st.session_state.tenant_info = page_data["tenant"]
+    return page_data
+
+
+def page_result(page_data: Dict[str, Dict], key: str, fallback):
+    """Use a prefetched result, otherwise make the call directly"""
+    if key in page_data:
+        return page_data[key]
+    return fallback()
 
 
 def login_form():
@@ -601,19 +450,19 @@ def login_form():
                         
                         # Store authentication data
                         st.session_state.api_client.set_auth_token(response["access_token"])
+                        with st.spinner("Loading your workspace..."):
+                            prefetch_pages(st.session_state.api_client)
                         st.session_state.authenticated = True
                         st.session_state.user_info = response["user"]
                         st.session_state.tenant_info = response["tenant"]
                         
                         st.success("Login successful!")
                         st.rerun()
-                        
-                    except requests.exceptions.RequestException as e:
-                        if hasattr(e, 'response') and e.response is not None:
-                            error_detail = e.response.json().get("detail", "Login failed")
-                            st.error(f"Login failed: {error_detail}")
-                        else:
-                            st.error("Unable to connect to the server. Please check if the API is running.")
+                    
+                    except APIError as e:
+                        st.error(f"Login failed: {e.detail}")
+                    except httpx.RequestError:
+                        st.error("Unable to connect to the server. Please check if the API is running.")
                     except Exception as e:
                         st.error(f"Login failed: {str(e)}")
         
@@ -713,13 +562,11 @@ def login_form():
                         
                         st.success(f"{response['message']} Welcome to your RAG system!")
                         st.rerun()
-                        
-                    except requests.exceptions.RequestException as e:
-                        if hasattr(e, 'response') and e.response is not None:
-                            error_detail = e.response.json().get("detail", "Signup failed")
-                            st.error(f"Signup failed: {error_detail}")
-                        else:
-                            st.error("Unable to connect to the server. Please check if the API is running.")
+                    
+                    except APIError as e:
+                        st.error(f"Signup failed: {e.detail}")
+                    except httpx.RequestError:
+                        st.error("Unable to connect to the server. Please check if the API is running.")
                     except Exception as e:
                         st.error(f"Signup failed: {str(e)}")
 
@@ -728,10 +575,6 @@ def sidebar():
     """Display sidebar with user info and navigation"""
     with st.sidebar:
         if st.session_state.authenticated:
-            # Initialize current page if not set
-            if 'current_page' not in st.session_state:
-                st.session_state.current_page = "Chat"
-            
             # User info section
             st.markdown('<div class="sidebar-section">User Information</div>', unsafe_allow_html=True)
             st.markdown(f'''
@@ -761,16 +604,13 @@ def sidebar():
             st.markdown('<div class="nav-container">', unsafe_allow_html=True)
             st.markdown('<div class="sidebar-section">Navigation</div>', unsafe_allow_html=True)
             
-            # Navigation buttons
-            pages = ["Chat", "Documents", "History"]
-            for page in pages:
+            # Navigation buttons; the callback switches pages within the click's own rerun
+            for page in PAGES:
                 is_active = st.session_state.current_page == page
                 active_class = "active" if is_active else ""
                 
                 st.markdown(f'<div class="nav-button {active_class}">', unsafe_allow_html=True)
-                if st.button(page, key=f"nav_{page}", use_container_width=True):
-                    st.session_state.current_page = page
-                    st.rerun()
+                st.button(page, key=f"nav_{page}", use_container_width=True, on_click=navigate, args=(page,))
                 st.markdown('</div>', unsafe_allow_html=True)
             
             st.markdown('</div>', unsafe_allow_html=True)
@@ -782,17 +622,60 @@ def sidebar():
         return "Chat"  # Default page when not authenticated
 
 
-def document_management():
+_TAG_SEPARATOR = re.compile(r"\s*,\s*")
+
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def _parse_tags(tags: str) -> List[str]:
+    """Split a comma-separated tag string"""
+    return [tag for tag in _TAG_SEPARATOR.split(tags.strip()) if tag]
+
+
+def _document_display(doc: Dict) -> Dict:
+    """Pre-formatted lines for a document's listing entry"""
+    dates = [f"**Uploaded:** {doc['uploaded_at'][:19]}"]
+    if doc['processed_at']:
+        dates.append(f"**Processed:** {doc['processed_at'][:19]}")
+    dates.append(f"**Word Count:** {doc['word_count']:,}")
+    if doc['tags']:
+        dates.append(f"**Tags:** {', '.join(doc['tags'])}")
+    
+    return {
+        "title": f"{doc['original_filename']} ({doc['status']})",
+        "details": [
+            f"**Status:** {doc['status']}",
+            f"**Size:** {doc['file_size']:,} bytes",
+            f"**Chunks:** {doc['processed_chunks']}/{doc['total_chunks']}",
+            f"**Language:** {doc['language']}"
+        ],
+        "dates": dates
+    }
+
+
+def _document_row(doc: Dict) -> Dict:
+    """A document's row in the documents table"""
+    return {
+        "Document": doc['original_filename'],
+        "Status": doc['status'],
+        "Size (bytes)": doc['file_size'],
+        "Chunks": f"{doc['processed_chunks']}/{doc['total_chunks']}",
+        "Uploaded": doc['uploaded_at'][:19]
+    }
+
+
+def document_management(page_data: Dict[str, Dict]):
     """Document management interface"""
     st.header("Document Management")
     
     # Upload section
     st.markdown("### Upload New Document")
-
+    
+    # A new key after each successful upload clears the picker
     uploaded_file = st.file_uploader(
         "Choose a file to upload",
         type=['pdf', 'txt', 'docx'],
-        help="Supported formats: PDF, TXT, DOCX (Max 10MB)"
+        help="Supported formats: PDF, TXT, DOCX (Max 10MB)",
+        key=f"uploader_{st.session_state.upload_nonce}"
     )
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -809,29 +692,39 @@ def document_management():
                 category = st.selectbox("Category", ["General", "Finance", "Legal", "Technical", "Other"])
                 description = st.text_area("Description", placeholder="Brief description of the document")
         
+        # The same file and metadata are only submitted once, even if the button is pressed again mid-upload
+        upload_key = (uploaded_file.file_id, title, category, description, tags)
         if st.button("Upload Document", type="primary"):
-            try:
-                # Prepare metadata
-                metadata = {
-                    "title": title,
-                    "category": category,
-                    "description": description,
-                    "tags": [tag.strip() for tag in tags.split(",") if tag.strip()]
-                }
-                
-                with st.spinner("Uploading document..."):
-                    file_data = uploaded_file.read()
+            if st.session_state.get("submitted_upload") == upload_key:
+                st.info("This document has already been submitted.")
+            else:
+                st.session_state.submitted_upload = upload_key
+                try:
+                    # Prepare metadata
+                    metadata = {
+                        "title": title,
+                        "category": category,
+                        "description": description,
+                        "tags": _parse_tags(tags)
+                    }
+                    
+                    progress = st.progress(0.0, text="Uploading document...")
+                    uploaded_file.seek(0)
                     response = st.session_state.api_client.upload_document(
-                        file_data=file_data,
+                        file_obj=ProgressReader(uploaded_file, uploaded_file.size, progress.progress),
                         filename=uploaded_file.name,
-                        metadata=metadata
+                        metadata=metadata,
+                        content_type=uploaded_file.type
                     )
+                    progress.empty()
+                    
+                    st.session_state.upload_nonce += 1
+                    st.success(f"Document uploaded successfully! ID: {response['id']}")
+                    st.info("Document is being processed in the background. It will be available for queries once processing is complete.")
                 
-                st.success(f"Document uploaded successfully! ID: {response['id']}")
-                st.info("Document is being processed in the background. It will be available for queries once processing is complete.")
-                
-            except Exception as e:
-                st.error(f"Upload failed: {str(e)}")
+                except Exception as e:
+                    st.session_state.submitted_upload = None
+                    st.error(f"Upload failed: {str(e)}")
     
     st.markdown("---")
     
@@ -855,19 +748,23 @@ def document_management():
             status_filter = st.selectbox(
                 "Filter by Status",
                 ["All", "pending", "processing", "processed", "failed"],
-                help="Filter documents by their current status"
+                help="Filter documents by their current status",
+                # Pages of the previous filter don't apply to the new one
+                on_change=lambda: st.session_state.pop("documents_page", None)
             )
         
         with col_actions:
             st.markdown("<br>", unsafe_allow_html=True)  # Add some spacing
             if st.button("Refresh List", use_container_width=True):
+                st.session_state.api_client.invalidate_cache()
                 st.rerun()
             
             # API connection test
             if st.button("Test API Connection", use_container_width=True):
                 try:
                     with st.spinner("Testing API connection..."):
-                        # Test with tenant info call
+                        # Test with an uncached tenant info call
+                        st.session_state.api_client.invalidate_cache()
                         tenant_info = st.session_state.api_client.get_tenant_info()
                         st.success("✅ API connection working!")
                         st.write(f"Connected to: {tenant_info['name']}")
@@ -877,25 +774,38 @@ def document_management():
                     st.write("Check if the backend server is running.")
     
     try:
+        # The status filter and paging are applied by the API, so only one page is ever loaded
+        client = st.session_state.api_client
+        page_number = st.session_state.get("documents_page", 1)
+        filter_param = None if status_filter == "All" else status_filter
+        
+        def load_documents(page_number: int) -> Dict:
+            if page_number == 1 and filter_param is None:
+                return page_result(page_data, "documents", client.list_documents)
+            return client.list_documents(
+                skip=(page_number - 1) * DOCUMENTS_PAGE_SIZE,
+                limit=DOCUMENTS_PAGE_SIZE,
+                status_filter=filter_param
+            )
+        
         with st.spinner("Loading documents..."):
-            # Apply status filter if selected
-            filter_param = None if status_filter == "All" else status_filter
-            docs_response = st.session_state.api_client.list_documents()
+            docs_response = load_documents(page_number)
+            
+            # Deletions can leave the selected page past the end; show the last page instead
+            last_page = max(docs_response["pages"], 1)
+            if page_number > last_page:
+                page_number = st.session_state.documents_page = last_page
+                docs_response = load_documents(page_number)
         
         documents = docs_response["documents"]
         
-        # Filter documents client-side if needed
-        if status_filter != "All":
-            documents = [doc for doc in documents if doc['status'] == status_filter]
-        
         # Display document count
-        total_docs = len(docs_response["documents"])
-        filtered_docs = len(documents)
+        total_docs = docs_response["total"]
         
         if status_filter == "All":
             st.markdown(f"**Total Documents:** {total_docs}")
         else:
-            st.markdown(f"**Showing:** {filtered_docs} of {total_docs} documents (Status: {status_filter})")
+            st.markdown(f"**Showing:** {total_docs} documents (Status: {status_filter})")
         
         if not documents:
             if status_filter == "All":
@@ -903,94 +813,232 @@ def document_management():
             else:
                 st.info(f"No documents found with status '{status_filter}'. Try changing the filter or upload new documents.")
         else:
-            for doc in documents:
-                with st.expander(f"{doc['original_filename']} ({doc['status']})"):
-                    col1, col2, col3 = st.columns([2, 2, 1])
-                    
-                    with col1:
-                        st.write(f"**Status:** {doc['status']}")
-                        st.write(f"**Size:** {doc['file_size']:,} bytes")
-                        st.write(f"**Chunks:** {doc['processed_chunks']}/{doc['total_chunks']}")
-                        st.write(f"**Language:** {doc['language']}")
-                    
-                    with col2:
-                        st.write(f"**Uploaded:** {doc['uploaded_at'][:19]}")
-                        if doc['processed_at']:
-                            st.write(f"**Processed:** {doc['processed_at'][:19]}")
-                        st.write(f"**Word Count:** {doc['word_count']:,}")
-                        if doc['tags']:
-                            st.write(f"**Tags:** {', '.join(doc['tags'])}")
+            if docs_response["pages"] > 1:
+                st.number_input("Page", min_value=1, max_value=docs_response["pages"], key="documents_page")
+            
+            # One table element for the whole page; details are rendered for the selected row only
+            table = st.dataframe(
+                [_document_row(doc) for doc in documents],
+                hide_index=True,
+                use_container_width=True,
+                on_select="rerun",
+                selection_mode="single-row",
+                key=f"documents_table_{status_filter}_{page_number}"
+            )
+            
+            if not table.selection.rows:
+                st.caption("Select a document to see its details and actions.")
+            else:
+                doc = documents[table.selection.rows[0]]
+                display = _document_display(doc)
+                st.markdown(f"#### {display['title']}")
+                col1, col2, col3 = st.columns([2, 2, 1])
+                
+                with col1:
+                    for line in display["details"]:
+                        st.write(line)
+                
+                with col2:
+                    for line in display["dates"]:
+                        st.write(line)
+                
+                with col3:
+                    st.write("**Actions:**")
                     
-                    with col3:
-                        st.write("**Actions:**")
+                    # Simple delete button - no confirmation
+                    st.markdown('<div class="delete-btn">', unsafe_allow_html=True)
+                    if st.button("Delete", key=f"delete_{doc['id']}", use_container_width=True):
+                        try:
+                            with st.spinner("Deleting document..."):
+                                # Debug information
+                                st.write(f"Debug: Deleting document ID: {doc['id']}")
+                                response = client.delete_document(doc['id'])
+                                st.write(f"Debug: Response: {response}")
+                            
+                            st.success(f"Document '{doc['original_filename']}' deleted successfully!")
+                            time.sleep(2)  # Brief pause to show success message
+                            st.rerun()
                         
-                        # Simple delete button - no confirmation
-                        st.markdown('<div class="delete-btn">', unsafe_allow_html=True)
-                        if st.button("Delete", key=f"delete_{doc['id']}", use_container_width=True):
-                            try:
-                                with st.spinner("Deleting document..."):
-                                    # Debug information
-                                    st.write(f"Debug: Deleting document ID: {doc['id']}")
-                                    response = st.session_state.api_client.delete_document(doc['id'])
-                                    st.write(f"Debug: Response: {response}")
-                                
-                                st.success(f"Document '{doc['original_filename']}' deleted successfully!")
-                                time.sleep(2)  # Brief pause to show success message
-                                st.rerun()
-                                
-                            except Exception as e:
-                                st.error(f"Failed to delete document: {str(e)}")
-                                st.write(f"Debug: Document ID was: {doc['id']}")
-                                st.write(f"Debug: API URL: {st.session_state.api_client.base_url}/documents/{doc['id']}")
-                        st.markdown('</div>', unsafe_allow_html=True)
+                        except Exception as e:
+                            st.error(f"Failed to delete document: {str(e)}")
+                            st.write(f"Debug: Document ID was: {doc['id']}")
+                            st.write(f"Debug: API URL: {client.base_url}/documents/{doc['id']}")
+                    st.markdown('</div>', unsafe_allow_html=True)
     
     except Exception as e:
         st.error(f"Failed to load documents: {str(e)}")
 
 
-def chat_interface():
-    """Main chat interface for RAG queries"""
-    st.header("RAG Chat Interface")
+def sources_html(context_documents: List[Dict]) -> str:
+    """Render context documents as one HTML block"""
+    html_parts = []
+    for j, doc in enumerate(context_documents, 1):
+        text = doc['text']
+        html_parts.append(f"""
+        <div class="context-doc">
+            <strong>Source {j}: {doc['source']}</strong><br>
+            <em>Score: {doc['score']:.3f} | Page: {doc.get('page_number', 'N/A')}</em><br>
+            {text[:200]}{'...' if len(text) > 200 else ''}
+        </div>
+        """)
+    return "".join(html_parts)
+
+
+def coalesce_deltas(events: Iterator[Dict], context_documents: List[Dict]) -> Iterator[str]:
+    """Join streamed deltas into batched text for st.write_stream, collecting sources on the side"""
+    buf = []
+    last_flush = time.monotonic()
+    for event in events:
+        if "context_documents" in event:
+            context_documents.extend(event["context_documents"])
+            continue
+        buf.append(event["delta"])
+        if len(buf) >= STREAM_FLUSH_DELTAS or time.monotonic() - last_flush >= STREAM_FLUSH_INTERVAL:
+            yield "".join(buf)
+            buf.clear()
+            last_flush = time.monotonic()
+    if buf:
+        yield "".join(buf)
+
+
+def chat_spill_path() -> Path:
+    """Append-only file holding this session's chat messages beyond CHAT_HISTORY_LIMIT"""
+    session_id = st.session_state.setdefault("chat_spill_id", uuid.uuid4().hex)
+    return _chat_spill_dir() / f"{session_id}.jsonl"
+
+
+def remove_stale_spills():
+    """Delete spill files of sessions that stopped chatting more than CHAT_SPILL_MAX_AGE ago"""
+    cutoff = time.time() - CHAT_SPILL_MAX_AGE
+    for path in _chat_spill_dir().glob("*.jsonl"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def append_chat_message(msg: Dict) -> Dict:
+    """Add a chat message, spilling the oldest ones to disk past the in-memory limit; returns the stored message"""
+    # Keep only what rendering needs: the pre-built sources block, not the full chunk text
+    docs = msg.get("context_documents")
+    if docs:
+        msg = {
+            **msg,
+            "_sources_html": sources_html(docs),
+            "context_documents": [{"source": doc["source"]} for doc in docs]
+        }
+    
+    history = st.session_state.chat_history
+    history.append(msg)
+    if len(history) <= CHAT_HISTORY_LIMIT:
+        return msg
+    
+    overflow = history[:-CHAT_HISTORY_LIMIT]
+    del history[:-CHAT_HISTORY_LIMIT]
+    remove_stale_spills()
+    with chat_spill_path().open("ab") as f:
+        for old in overflow:
+            f.write(orjson.dumps(old) + b"\n")
+    return msg
+
+
+def load_spilled_messages() -> List[Dict]:
+    """Read this session's spilled chat messages, oldest first"""
+    path = chat_spill_path()
+    if not path.exists():
+        return []
+    with path.open("rb") as f:
+        return [orjson.loads(line) for line in f]
+
+
+def clear_chat_history():
+    """Drop the chat history, including messages spilled to disk"""
+    st.session_state.chat_history = []
+    chat_spill_path().unlink(missing_ok=True)
+
+
+def render_sources(msg: Dict):
+    """Render a message's sources in an expander"""
+    with st.expander(f"Sources ({len(msg['context_documents'])} documents)"):
+        # Built once per message and emitted as a single element
+        if "_sources_html" not in msg:
+            msg["_sources_html"] = sources_html(msg["context_documents"])
+        st.markdown(msg["_sources_html"], unsafe_allow_html=True)
+
+
+def render_messages(messages: List[Dict], include_sources: bool):
+    """Render chat messages with their sources"""
+    # Consecutive turns are joined into one markdown element, split only where a sources expander goes
+    parts = []
+    for i, msg in enumerate(messages):
+        speaker = "You" if msg["type"] == "user" else "Assistant"
+        parts.append(f"**{speaker}:** {msg['content']}")
+        
+        if msg["type"] != "user" and msg.get("context_documents") and include_sources:
+            st.markdown("\n\n".join(parts))
+            parts = []
+            render_sources(msg)
+        
+        if i < len(messages) - 1:
+            parts.append("---")
     
-    # Query configuration
+    if parts:
+        st.markdown("\n\n".join(parts))
+
+
+@st.fragment
+def query_settings():
+    """Query settings; widget changes rerun only this fragment"""
     with st.expander("Query Settings"):
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            max_chunks = st.slider("Max Context Chunks", 1, 10, 5)
-            temperature = st.slider("Temperature", 0.0, 2.0, 0.7, 0.1)
+            st.slider("Max Context Chunks", 1, 10, 5, key="max_chunks")
+            st.slider("Temperature", 0.0, 2.0, 0.7, 0.1, key="temperature")
         
         with col2:
-            score_threshold = st.slider("Similarity Threshold", 0.0, 1.0, 0.3, 0.1)
-            max_tokens = st.slider("Max Response Tokens", 100, 2000, 1000, 100)
+            st.slider("Similarity Threshold", 0.0, 1.0, 0.3, 0.1, key="score_threshold")
+            st.slider("Max Response Tokens", 100, 2000, 1000, 100, key="max_tokens")
         
         with col3:
-            include_sources = st.checkbox("Include Sources", value=True)
-            stream_response = st.checkbox("Stream Response", value=False)
+            st.checkbox("Include Sources", value=True, key="include_sources")
+            st.checkbox("Stream Response", value=True, key="stream_response")
+    
+    # Sources are rendered in the history outside this fragment, so only
+    # that toggle needs a full rerun
+    if st.session_state.include_sources != st.session_state.sources_rendered:
+        st.rerun()
+
+
+def chat_interface():
+    """Main chat interface for RAG queries"""
+    st.header("RAG Chat Interface")
+    
+    # Query configuration; record what this full run renders before the fragment compares
+    st.session_state.sources_rendered = st.session_state.get("include_sources", True)
+    query_settings()
+    max_chunks = st.session_state.max_chunks
+    temperature = st.session_state.temperature
+    score_threshold = st.session_state.score_threshold
+    max_tokens = st.session_state.max_tokens
+    include_sources = st.session_state.include_sources
+    stream_response = st.session_state.stream_response
     
     # Chat history display
     st.markdown("### Conversation")
     
-    # Display chat history
-    for i, msg in enumerate(st.session_state.chat_history):
-        if msg["type"] == "user":
-            st.markdown(f"**You:** {msg['content']}")
-        else:
-            st.markdown(f"**Assistant:** {msg['content']}")
-            
-            if "context_documents" in msg and include_sources:
-                with st.expander(f"Sources ({len(msg['context_documents'])} documents)"):
-                    for j, doc in enumerate(msg["context_documents"], 1):
-                        st.markdown(f"""
-                        <div class="context-doc">
-                            <strong>Source {j}: {doc['source']}</strong><br>
-                            <em>Score: {doc['score']:.3f} | Page: {doc.get('page_number', 'N/A')}</em><br>
-                            {doc['text'][:200]}{'...' if len(doc['text']) > 200 else ''}
-                        </div>
-                        """, unsafe_allow_html=True)
-        
-        if i < len(st.session_state.chat_history) - 1:
-            st.markdown("---")
+    # Display chat history; older messages, in memory or spilled to disk, are only rendered on request
+    history = st.session_state.chat_history
+    older, recent = history[:-CHAT_HISTORY_WINDOW], history[-CHAT_HISTORY_WINDOW:]
+    spilled = len(history) == CHAT_HISTORY_LIMIT and chat_spill_path().exists()
+    if (older or spilled) and st.toggle("Show older messages", key="show_older_messages"):
+        render_messages(load_spilled_messages() + older, include_sources)
+        st.markdown("---")
+    render_messages(recent, include_sources)
+    
+    # A new turn is rendered here in the run that submits it, so no rerun is needed afterwards
+    new_turn = st.container()
     
     # Query input
     st.markdown("### Ask a Question")
@@ -1011,28 +1059,56 @@ def chat_interface():
         clear_history = st.button("Clear History", use_container_width=True)
     
     if clear_history:
-        st.session_state.chat_history = []
+        clear_chat_history()
         st.rerun()
     
     if submit_query and query.strip():
+        separator = "---\n\n" if history else ""
+        new_turn.markdown(f"{separator}**You:** {query}\n\n---")
+        
         # Add user message to history
-        st.session_state.chat_history.append({
+        append_chat_message({
             "type": "user",
             "content": query,
             "timestamp": datetime.now()
         })
         
         try:
-            with st.spinner("Generating response..."):
-                response = st.session_state.api_client.rag_query(
+            if stream_response:
+                # Render batched tokens as they arrive; history is only updated once the stream ends
+                start_time = time.time()
+                context_documents = []
+                events = st.session_state.api_client.rag_query(
                     query=query,
                     max_chunks=max_chunks,
                     score_threshold=score_threshold,
                     temperature=temperature,
                     max_tokens=max_tokens,
                     include_sources=include_sources,
-                    stream=stream_response
+                    stream=True
                 )
+                with new_turn:
+                    st.markdown("**Assistant:**")
+                    text = st.write_stream(coalesce_deltas(events, context_documents))
+                
+                # The stream carries sources and text, but no token usage
+                response = {
+                    "response": text,
+                    "processing_time_ms": (time.time() - start_time) * 1000,
+                    "context_documents": context_documents,
+                    "total_tokens": 0
+                }
+            else:
+                with st.spinner("Generating response..."):
+                    response = st.session_state.api_client.rag_query(
+                        query=query,
+                        max_chunks=max_chunks,
+                        score_threshold=score_threshold,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        include_sources=include_sources,
+                        stream=False
+                    )
             
             # Add assistant response to history
             assistant_msg = {
@@ -1044,76 +1120,125 @@ def chat_interface():
                 "tokens_used": response["total_tokens"]
             }
             
-            st.session_state.chat_history.append(assistant_msg)
-            
-            # Show success message
-            st.success(f"Response generated in {response['processing_time_ms']:.0f}ms using {response['total_tokens']} tokens")
+            assistant_msg = append_chat_message(assistant_msg)
             
-            st.rerun()
+            with new_turn:
+                if stream_response:
+                    if assistant_msg.get("context_documents") and include_sources:
+                        render_sources(assistant_msg)
+                else:
+                    render_messages([assistant_msg], include_sources)
             
+            # Show success message
+            # Streamed responses don't report token usage
+            tokens_note = f" using {response['total_tokens']} tokens" if response["total_tokens"] else ""
+            st.success(f"Response generated in {response['processing_time_ms']:.0f}ms{tokens_note}")
+        
         except Exception as e:
             st.error(f"Query failed: {str(e)}")
 
 
-def query_history():
+def _query_row(query: Dict) -> Dict:
+    """A query's row in the history table"""
+    return {
+        "Asked": query['created_at'][:19],
+        "Query": query['query_text'],
+        "Status": query['status'],
+        "Time (ms)": round(query.get('processing_time_ms') or 0),
+        "Tokens": query.get('total_tokens', 0)
+    }
+
+
+def query_history(page_data: Dict[str, Dict]):
     """Display query history and analytics"""
     st.header("Query History & Analytics")
     
+    client = st.session_state.api_client
+    
     try:
         with st.spinner("Loading query history..."):
-            history_response = st.session_state.api_client.get_query_history(limit=20)
-        
-        queries = history_response["queries"]
+            history_response = page_result(
+                page_data, "history",
+                lambda: client.get_query_history(limit=20)
+            )
+            stats = page_result(page_data, "history_stats", client.get_query_history_stats)
+            
+            # Further pages the user asked for, each continuing from the previous page's cursor
+            queries = list(history_response["queries"])
+            next_cursor = history_response.get("next_cursor")
+            for cursor in st.session_state.setdefault("history_cursors", []):
+                more = client.get_query_history(limit=20, cursor=cursor)
+                queries.extend(more["queries"])
+                next_cursor = more["next_cursor"]
         
         if not queries:
             st.info("No queries found.")
             return
         
-        # Analytics summary
+        # Analytics summary, aggregated by the API over the whole history
         st.markdown("### Summary")
         col1, col2, col3, col4 = st.columns(4)
         
-        total_queries = len(queries)
-        avg_processing_time = sum(q.get("processing_time_ms", 0) for q in queries) / total_queries if total_queries > 0 else 0
-        total_tokens = sum(q.get("total_tokens", 0) for q in queries)
-        
         with col1:
-            st.metric("Total Queries", total_queries)
+            st.metric("Total Queries", stats["total_queries"])
         
         with col2:
-            st.metric("Avg Processing Time", f"{avg_processing_time:.0f}ms")
+            st.metric("Avg Processing Time", f"{stats['avg_processing_time_ms']:.0f}ms")
         
         with col3:
-            st.metric("Total Tokens Used", f"{total_tokens:,}")
+            st.metric("Total Tokens Used", f"{stats['total_tokens']:,}")
         
         with col4:
-            successful_queries = sum(1 for q in queries if q.get("status") == "completed")
-            success_rate = (successful_queries / total_queries * 100) if total_queries > 0 else 0
-            st.metric("Success Rate", f"{success_rate:.1f}%")
+            st.metric("Success Rate", f"{stats['success_rate']:.1f}%")
         
         st.markdown("---")
         
         # Query list
         st.markdown("### Recent Queries")
         
-        for query in queries:
-            with st.expander(f"{query['query_text'][:100]}... ({query['created_at'][:19]})"):
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.write(f"**Status:** {query['status']}")
-                    st.write(f"**Processing Time:** {query.get('processing_time_ms', 0):.0f}ms")
-                    st.write(f"**Chunks Retrieved:** {query.get('retrieved_chunks_count', 0)}")
-                
-                with col2:
-                    st.write(f"**LLM Provider:** {query.get('llm_provider', 'N/A')}")
-                    st.write(f"**Total Tokens:** {query.get('total_tokens', 0):,}")
-                    if query.get('user_rating'):
-                        st.write(f"**Rating:** {'⭐' * query['user_rating']}")
-                
-                if query.get("response"):
-                    st.markdown("**Response:**")
-                    st.write(query["response"]["response_text"][:500] + "..." if len(query["response"]["response_text"]) > 500 else query["response"]["response_text"])
+        # One table element for all loaded rows; details are rendered for the selected row only
+        table = st.dataframe(
+            [_query_row(query) for query in queries],
+            hide_index=True,
+            use_container_width=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            key=f"history_table_{len(queries)}"
+        )
+        
+        if not table.selection.rows:
+            st.caption("Select a query to see its details and response.")
+        else:
+            query = queries[table.selection.rows[0]]
+            st.markdown(f"#### {query['query_text'][:100]}")
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.write(f"**Status:** {query['status']}")
+                st.write(f"**Processing Time:** {query.get('processing_time_ms') or 0:.0f}ms")
+                st.write(f"**Chunks Retrieved:** {query.get('retrieved_chunks_count', 0)}")
+            
+            with col2:
+                st.write(f"**LLM Provider:** {query.get('llm_provider', 'N/A')}")
+                st.write(f"**Total Tokens:** {query.get('total_tokens', 0):,}")
+                if query.get('user_rating'):
+                    st.write(f"**Rating:** {'⭐' * query['user_rating']}")
+            
+            response = query.get("response")
+            if response:
+                st.markdown("**Response:**")
+                if not response.get("response_truncated"):
+                    st.write(response["response_text"])
+                elif st.toggle("Show full response", key=f"full_response_{query['id']}"):
+                    st.write(client.get_query(query["id"])["response"]["response_text"])
+                else:
+                    st.write(response["response_text"] + "...")
+        
+        if next_cursor:
+            st.button(
+                "Load more",
+                on_click=lambda: st.session_state.history_cursors.append(next_cursor)
+            )
     
     except Exception as e:
         st.error(f"Failed to load query history: {str(e)}")
@@ -1124,8 +1249,9 @@ def logout():
     st.session_state.authenticated = False
     st.session_state.user_info = None
     st.session_state.tenant_info = None
-    st.session_state.chat_history = []
-    st.session_state.api_client = APIClient(API_BASE_URL)
+    clear_chat_history()
+    st.session_state.pop("history_cursors", None)
+    st.session_state.api_client.clear_auth_token()
     st.rerun()
 
 
@@ -1137,6 +1263,11 @@ def main():
         login_form()
         return
     
+    # Tenant info and the page listings arrive in one round trip, before
+    # the sidebar renders so it shows fresh tenant settings
+    current_page = st.session_state.current_page
+    page_data = load_page_data(current_page) if current_page in ("Documents", "History") else {}
+    
     # Sidebar navigation
     page = sidebar()
     
@@ -1152,9 +1283,9 @@ def main():
     if page == "Chat":
         chat_interface()
     elif page == "Documents":
-        document_management()
+        document_management(page_data)
     elif page == "History":
-        query_history()
+        query_history(page_data)
 
 
 if __name__ == "__main__":
@@ -4,10 +4,16 @@ Setup script for creating sample tenants and users
 Run this script after the application is up and running
 """
 import asyncio
+import io
+import orjson
 import requests
-import json
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder
+from urllib3.util.retry import Retry
 
 # API configuration
 API_BASE_URL = "http://localhost:8000/api/v1"
@@ -50,30 +56,78 @@ SAMPLE_USERS = [
 ]
 
 
+# Sample document content, encoded once and streamed from memory on each upload
+SAMPLE_DOCUMENT = """
+# Sample Company Document
+
+## About Our Company
+Our company has been providing innovative solutions for over 10 years. We specialize in technology consulting and software development.
+
+## Services
+- Software Development
+- Cloud Solutions
+- Data Analytics
+- AI/ML Consulting
+
+## Contact Information
+Email: info@company.com
+Phone: +1 (555) 123-4567
+Address: 123 Tech Street, Silicon Valley, CA 94000
+
+## Mission Statement
+To deliver cutting-edge technology solutions that drive business success and innovation.
+""".strip().encode()
+
+
+def json_body(data: dict) -> dict:
+    """Request arguments sending data as an orjson-encoded JSON body"""
+    return {"data": orjson.dumps(data), "headers": {"Content-Type": "application/json"}}
+
+
 class SetupClient:
     """Client for setting up sample data"""
     
     def __init__(self, base_url: str):
         self.base_url = base_url
-        self.session = requests.Session()
         self.admin_token = None
+        
+        # Pooled keep-alive connections shared by the setup threads; idempotent
+        # requests are retried through connection errors and gateway failures
+        adapter = HTTPAdapter(
+            pool_connections=20,
+            pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # Health polling has its own backoff, so it goes through a session without retries
+        self.probe_session = requests.Session()
     
-    def wait_for_api(self, max_retries: int = 30):
-        """Wait for API to be available"""
-        for i in range(max_retries):
+    def wait_for_api(self, max_wait: float = 60.0):
+        """Wait for API to be available, polling with exponential backoff"""
+        deadline = time.monotonic() + max_wait
+        delay = 0.05
+        attempt = 0
+        
+        while True:
+            attempt += 1
             try:
-                response = self.session.get(f"{self.base_url}/../health")
+                # Short connect timeout so a down server fails fast; the session keeps the connection alive
+                response = self.probe_session.get(f"{self.base_url}/../health", timeout=(0.5, 5))
                 if response.status_code == 200:
                     print("✅ API is available")
                     return True
             except requests.exceptions.RequestException:
                 pass
             
-            print(f"⏳ Waiting for API... (attempt {i+1}/{max_retries})")
-            import time
-            time.sleep(2)
-        
-        return False
+            if time.monotonic() + delay > deadline:
+                return False
+            
+            print(f"⏳ Waiting for API... (attempt {attempt})")
+            time.sleep(delay)
+            delay = min(delay * 1.7, 1.0)
     
     def create_admin_user(self) -> bool:
         """Create initial admin user"""
@@ -86,10 +140,10 @@ class SetupClient:
     def login_as_admin(self, email: str, password: str) -> bool:
         """Login as admin user"""
         try:
-            response = self.session.post(f"{self.base_url}/auth/login", json={
+            response = self.session.post(f"{self.base_url}/auth/login", **json_body({
                 "email": email,
                 "password": password
-            })
+            }))
             
             if response.status_code == 200:
                 data = response.json()
@@ -100,7 +154,7 @@ class SetupClient:
             else:
                 print(f"❌ Failed to login as admin: {response.text}")
                 return False
-                
+        
         except Exception as e:
             print(f"❌ Login failed: {e}")
             return False
@@ -108,7 +162,7 @@ class SetupClient:
     def create_tenant(self, tenant_data: dict) -> dict:
         """Create a new tenant"""
         try:
-            response = self.session.post(f"{self.base_url}/auth/tenants", json=tenant_data)
+            response = self.session.post(f"{self.base_url}/auth/tenants", **json_body(tenant_data))
             
             if response.status_code == 200:
                 tenant = response.json()
@@ -117,7 +171,7 @@ class SetupClient:
             else:
                 print(f"❌ Failed to create tenant {tenant_data['name']}: {response.text}")
                 return None
-                
+        
         except Exception as e:
             print(f"❌ Tenant creation failed: {e}")
             return None
@@ -127,7 +181,7 @@ class SetupClient:
         try:
             response = self.session.post(
                 f"{self.base_url}/auth/register",
-                json=user_data,
+                **json_body(user_data),
                 params={"tenant_id": tenant_id}
             )
             
@@ -138,7 +192,7 @@ class SetupClient:
             else:
                 print(f"❌ Failed to create user {user_data['email']}: {response.text}")
                 return None
-                
+        
         except Exception as e:
             print(f"❌ User creation failed: {e}")
             return None
@@ -147,56 +201,37 @@ class SetupClient:
         """Create a sample document"""
         try:
             # Login as user
-            login_response = self.session.post(f"{self.base_url}/auth/login", json={
+            login_response = self.session.post(f"{self.base_url}/auth/login", **json_body({
                 "email": user_email,
                 "password": user_password,
                 "tenant_identifier": tenant_id
-            })
+            }))
             
             if login_response.status_code != 200:
                 print(f"❌ Failed to login as user for document upload")
                 return
             
+            # Upload over the pooled session, authenticated as the user for this request only
             user_token = login_response.json()["access_token"]
-            user_session = requests.Session()
-            user_session.headers.update({"Authorization": f"Bearer {user_token}"})
+            user_headers = {"Authorization": f"Bearer {user_token}"}
             
-            # Create sample document content
-            sample_content = """
-# Sample Company Document
-
-## About Our Company
-Our company has been providing innovative solutions for over 10 years. We specialize in technology consulting and software development.
-
-## Services
-- Software Development
-- Cloud Solutions
-- Data Analytics
-- AI/ML Consulting
-
-## Contact Information
-Email: info@company.com
-Phone: +1 (555) 123-4567
-Address: 123 Tech Street, Silicon Valley, CA 94000
-
-## Mission Statement
-To deliver cutting-edge technology solutions that drive business success and innovation.
-            """.strip()
-            
-            # Upload document
-            files = {
-                "file": ("sample_document.txt", sample_content, "text/plain")
-            }
-            data = {
-                "metadata": json.dumps({
+            # Upload document; the multipart body is streamed from the file object
+            # instead of being assembled in memory by requests
+            encoder = MultipartEncoder(fields={
+                "file": ("sample_document.txt", io.BytesIO(SAMPLE_DOCUMENT), "text/plain"),
+                "metadata": orjson.dumps({
                     "title": "Sample Company Document",
                     "category": "General",
                     "description": "A sample document for testing the RAG system",
                     "tags": ["sample", "company", "info"]
-                })
-            }
+                }).decode()
+            })
             
-            response = user_session.post(f"{self.base_url}/documents/upload", files=files, data=data)
+            response = self.session.post(
+                f"{self.base_url}/documents/upload",
+                data=encoder,
+                headers={**user_headers, "Content-Type": encoder.content_type}
+            )
             
             if response.status_code == 200:
                 doc = response.json()
@@ -239,30 +274,40 @@ def main():
         print("❌ Cannot proceed without admin access")
         return
     
-    print("\n🏢 Creating sample tenants...")
-    created_tenants = []
-    
-    for tenant_data in SAMPLE_TENANTS:
-        tenant = client.create_tenant(tenant_data)
-        if tenant:
-            created_tenants.append(tenant)
-    
-    print(f"\n👥 Creating sample users...")
-    
-    # Create users for each tenant
-    for i, tenant in enumerate(created_tenants):
-        # Create admin user for tenant
-        admin_user_data = SAMPLE_USERS[i * 2] if i * 2 < len(SAMPLE_USERS) else SAMPLE_USERS[0]
-        client.create_user(admin_user_data, tenant["id"])
+    # Tenants are independent of each other, so their requests run concurrently
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        print("\n🏢 Creating sample tenants...")
+        created_tenants = [
+            tenant for tenant in executor.map(client.create_tenant, SAMPLE_TENANTS) if tenant
+        ]
+        
+        print(f"\n👥 Creating sample users...")
         
-        # Create regular user for tenant if available
-        if (i * 2 + 1) < len(SAMPLE_USERS):
-            user_data = SAMPLE_USERS[i * 2 + 1]
-            client.create_user(user_data, tenant["id"])
+        # Collect every tenant's users so the pool creates them all in one pass
+        user_requests = []
+        document_requests = []
+        for i, tenant in enumerate(created_tenants):
+            # Create admin user for tenant
+            admin_user_data = SAMPLE_USERS[i * 2] if i * 2 < len(SAMPLE_USERS) else SAMPLE_USERS[0]
+            user_requests.append((admin_user_data, tenant["id"]))
             
-            # Create sample document
+            # Create regular user for tenant if available
+            if (i * 2 + 1) < len(SAMPLE_USERS):
+                user_data = SAMPLE_USERS[i * 2 + 1]
+                user_requests.append((user_data, tenant["id"]))
+                document_requests.append((tenant, user_data))
+        
+        list(executor.map(lambda request: client.create_user(*request), user_requests))
+        
+        # Create sample documents once every user request has finished
+        for tenant, _ in document_requests:
             print(f"\n📄 Creating sample document for {tenant['name']}...")
-            client.create_sample_document(tenant["id"], user_data["email"], user_data["password"])
+        list(executor.map(
+            lambda request: client.create_sample_document(
+                request[0]["id"], request[1]["email"], request[1]["password"]
+            ),
+            document_requests
+        ))
     
     print("\n✅ Setup completed successfully!")
     print("\n📋 Summary:")
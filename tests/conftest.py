@@ -4,24 +4,46 @@ Pytest configuration and fixtures for testing
 import pytest
 import asyncio
 from typing import Generator
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool
+from passlib.context import CryptContext
 from fastapi.testclient import TestClient
-from app.main import app
 from app.database.base import Base
-from app.database.session import get_db
 from app.config import settings
 
 
-# Test database URL (use SQLite for testing)
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+# Test database URL (in-memory SQLite, one connection shared by every session);
+# each pytest-xdist worker is its own process and so gets its own database
+SQLALCHEMY_DATABASE_URL = "sqlite://"
 
 # Create test engine
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
 )
 
+
+# pysqlite manages transactions itself and breaks SAVEPOINT; let SQLAlchemy emit BEGIN instead
+@event.listens_for(engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _emit_begin(connection):
+    connection.exec_driver_sql("BEGIN")
+
+
+# The models use Postgres JSONB columns; SQLite stores them as plain JSON
+@compiles(JSONB, "sqlite")
+def _compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
 # Create test session
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -34,24 +56,55 @@ def event_loop():
     loop.close()
 
 
-@pytest.fixture(scope="function")
-def db_session() -> Generator[Session, None, None]:
-    """Create a fresh database session for each test"""
-    # Create all tables
+@pytest.fixture(scope="session", autouse=True)
+def fast_password_hashing() -> Generator[None, None, None]:
+    """Hash passwords with the minimum bcrypt cost; the default 12 rounds dominate test time"""
+    from app.services import auth_service
+    
+    original = auth_service.pwd_context
+    auth_service.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=4)
+    yield
+    auth_service.pwd_context = original
+
+
+@pytest.fixture(scope="session")
+def hashed_password(fast_password_hashing) -> str:
+    """bcrypt hash of "password", computed once per test session"""
+    from app.services.auth_service import AuthService
+    
+    return AuthService().hash_password("password")
+
+
+@pytest.fixture(scope="session")
+def db_schema() -> Generator[None, None, None]:
+    """Create all tables once for the test session"""
     Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="function")
+def db_session(db_schema) -> Generator[Session, None, None]:
+    """Create a database session whose changes are rolled back after each test"""
+    connection = engine.connect()
+    transaction = connection.begin()
     
-    session = TestingSessionLocal()
+    # Commits inside the test only release a savepoint; the outer transaction is never committed
+    session = TestingSessionLocal(bind=connection, join_transaction_mode="create_savepoint")
     try:
         yield session
     finally:
         session.close()
-        # Drop all tables after test
-        Base.metadata.drop_all(bind=engine)
+        transaction.rollback()
+        connection.close()
 
 
 @pytest.fixture(scope="function")
 def client(db_session: Session) -> TestClient:
     """Create a test client with database override"""
+    # Imported here so collecting tests that never use the API doesn't build the whole app
+    from app.main import app
+    from app.database.session import get_db
     
     def override_get_db():
         try:
@@ -97,4 +150,35 @@ def sample_admin_user_data():
         "username": "testadmin",
         "password": "adminpassword123",
         "role": "admin"
-    }
\ No newline at end of file
+    }
+
+
+@pytest.fixture
+def current_user(db_session: Session, sample_tenant_data, sample_user_data, hashed_password):
+    """Persisted tenant and user that authenticated test requests act as"""
+    from app.models.tenant import Tenant, TenantUser
+    
+    tenant = Tenant(**sample_tenant_data)
+    db_session.add(tenant)
+    db_session.flush()
+    
+    user = TenantUser(
+        tenant_id=tenant.id,
+        email=sample_user_data["email"],
+        username=sample_user_data["username"],
+        hashed_password=hashed_password,
+        role=sample_user_data["role"]
+    )
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_client(client: TestClient, current_user) -> TestClient:
+    """Test client whose requests are authenticated as current_user"""
+    from app.dependencies import get_current_active_user, get_current_tenant
+    
+    client.app.dependency_overrides[get_current_active_user] = lambda: current_user
+    client.app.dependency_overrides[get_current_tenant] = lambda: current_user.tenant
+    return client
@@ -2,6 +2,8 @@
 Basic API endpoint tests
 """
 import pytest
+from datetime import datetime, timedelta
+from unittest.mock import Mock
 from fastapi.testclient import TestClient
 
 
@@ -96,6 +98,102 @@ class TestQueryEndpoints:
         assert response.status_code == 401
 
 
+class TestQueryHistoryEndpoints:
+    """Test query history paging and statistics"""
+    
+    @pytest.fixture
+    def history(self, db_session, current_user):
+        """Seven queries, two of them sharing a timestamp"""
+        from app.models.query import Query
+        
+        start = datetime(2024, 1, 1)
+        queries = [
+            Query(
+                tenant_id=current_user.tenant_id,
+                user_id=current_user.id,
+                query_text=f"query {i}",
+                created_at=start + timedelta(minutes=min(i, 5)),
+                processing_time_ms=100.0 * i,
+                total_tokens=10,
+                status="completed" if i % 2 == 0 else "failed"
+            )
+            for i in range(7)
+        ]
+        db_session.add_all(queries)
+        db_session.commit()
+        return queries
+    
+    def test_cursor_pages_cover_history_once(self, auth_client: TestClient, history):
+        """Test following next_cursor returns every query once, newest first"""
+        seen = []
+        params = {"limit": 3}
+        while True:
+            response = auth_client.get("/api/v1/queries/history", params=params)
+            assert response.status_code == 200
+            data = response.json()
+            seen += [query["query_text"] for query in data["queries"]]
+            
+            if "cursor" in params:
+                # Cursor pages don't count the history
+                assert data["total"] is None
+            else:
+                assert data["total"] == 7
+            
+            if not data["next_cursor"]:
+                break
+            params["cursor"] = data["next_cursor"]
+        
+        # The two newest share a timestamp and are ordered by id between themselves
+        assert set(seen[:2]) == {"query 5", "query 6"}
+        assert seen[2:] == [f"query {i}" for i in range(4, -1, -1)]
+    
+    def test_invalid_cursor(self, auth_client: TestClient):
+        """Test a malformed cursor is rejected"""
+        response = auth_client.get("/api/v1/queries/history", params={"cursor": "not-a-cursor"})
+        
+        assert response.status_code == 400
+    
+    def test_history_stats(self, auth_client: TestClient, history):
+        """Test statistics are aggregated over the whole history"""
+        response = auth_client.get("/api/v1/queries/history/stats")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_queries"] == 7
+        assert data["avg_processing_time_ms"] == pytest.approx(300.0)
+        assert data["total_tokens"] == 70
+        assert data["success_rate"] == pytest.approx(4 / 7 * 100)
+
+
+class TestDashboardEndpoints:
+    """Test the combined dashboard endpoint"""
+    
+    def test_dashboard(self, auth_client: TestClient, current_user):
+        """Test the dashboard combines tenant, documents, history and stats"""
+        from app.dependencies import get_document_service
+        
+        # The document listing itself is covered by the documents endpoint
+        document_service = Mock()
+        document_service.list_documents.return_value = []
+        auth_client.app.dependency_overrides[get_document_service] = lambda: document_service
+        
+        response = auth_client.get("/api/v1/dashboard", params={"history_limit": 5})
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["tenant"]["name"] == current_user.tenant.name
+        assert data["documents"]["total"] == 0
+        assert data["history"]["queries"] == []
+        assert data["history"]["size"] == 5
+        assert data["history_stats"]["total_queries"] == 0
+    
+    def test_dashboard_without_auth(self, client: TestClient):
+        """Test the dashboard requires authentication"""
+        response = client.get("/api/v1/dashboard")
+        
+        assert response.status_code == 401
+
+
 # Integration test (more complex)
 class TestTenantWorkflow:
     """Test complete tenant workflow"""
@@ -32,14 +32,14 @@ def sample_tenant():
 
 
 @pytest.fixture
-def sample_user(sample_tenant):
+def sample_user(sample_tenant, hashed_password):
     """Create sample user"""
     return TenantUser(
         id="550e8400-e29b-41d4-a716-446655440001",
         tenant_id=sample_tenant.id,
         email="test@example.com",
         username="testuser",
-        hashed_password="$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewrBGmn6NjMtVOzG",  # hashed "password"
+        hashed_password=hashed_password,  # hashed "password"
         role="user",
         is_active=True
     )
@@ -160,16 +160,14 @@ class TestAuthService:
         mock_db.query.return_value.filter.return_value.first.return_value = sample_user
         mock_db.commit.return_value = None
         
-        # Set up password verification (the sample_user has hashed "password")
+        # The sample_user has hashed "password"
         authenticated_user = auth_service.authenticate_user(
             db=mock_db,
             email=sample_user.email,
-            password="password"  # This should match the hashed password in sample_user
+            password="password"
         )
         
-        # Note: This test might fail due to password hashing complexity
-        # In a real test, you'd mock the password verification
-        # assert authenticated_user == sample_user
+        assert authenticated_user == sample_user
     
     def test_authenticate_user_wrong_password(self, auth_service, mock_db, sample_user):
         """Test user authentication with wrong password"""
@@ -0,0 +1,67 @@
+"""
+Tests for semantic cache
+"""
+import pytest
+import numpy as np
+from app.services.cache_service import SemanticCache
+
+
+@pytest.fixture
+def cache():
+    """Create semantic cache instance"""
+    return SemanticCache(threshold=0.97, ttl=60)
+
+
+class TestSemanticCache:
+    """Test cases for SemanticCache"""
+    
+    def test_exact_match(self, cache):
+        """Test lookup with the same embedding hits"""
+        cache.set("tenant-a", np.array([1.0, 0.0, 0.0]), "answer")
+        
+        assert cache.get("tenant-a", np.array([1.0, 0.0, 0.0])) == "answer"
+    
+    def test_near_duplicate_match(self, cache):
+        """Test lookup with a slightly different embedding hits"""
+        cache.set("tenant-a", np.array([1.0, 0.0, 0.0]), "answer")
+        
+        assert cache.get("tenant-a", np.array([1.0, 0.05, 0.0])) == "answer"
+        assert cache.get("tenant-a", np.array([1.0, 1.0, 0.0])) is None
+    
+    def test_namespaces_are_isolated(self, cache):
+        """Test entries are not shared across namespaces"""
+        cache.set("tenant-a", np.array([1.0, 0.0, 0.0]), "answer")
+        
+        assert cache.get("tenant-b", np.array([1.0, 0.0, 0.0])) is None
+        assert cache.stats()["hits"] == 0
+        assert cache.stats()["misses"] == 1
+    
+    def test_invalidate_namespace(self, cache):
+        """Test invalidation drops a namespace"""
+        cache.set("tenant-a", np.array([1.0, 0.0, 0.0]), "answer")
+        cache.invalidate("tenant-a")
+        
+        assert cache.get("tenant-a", np.array([1.0, 0.0, 0.0])) is None
+    
+    def test_invalidate_matching(self, cache):
+        """Test predicate invalidation drops only matching namespaces"""
+        cache.set(("tenant-a", 5), np.array([1.0, 0.0, 0.0]), "a")
+        cache.set(("tenant-b", 5), np.array([1.0, 0.0, 0.0]), "b")
+        cache.invalidate_matching(lambda namespace: namespace[0] == "tenant-a")
+        
+        assert cache.get(("tenant-a", 5), np.array([1.0, 0.0, 0.0])) is None
+        assert cache.get(("tenant-b", 5), np.array([1.0, 0.0, 0.0])) == "b"
+    
+    def test_empty_embedding_is_ignored(self, cache):
+        """Test empty embeddings from a failed embedding call never hit or get stored"""
+        cache.set("tenant-a", np.array([1.0, 0.0, 0.0]), "answer")
+        cache.set("tenant-a", np.empty(0), "empty")
+        
+        assert cache.get("tenant-a", np.empty(0)) is None
+        assert cache.get("tenant-a", np.array([1.0, 0.0, 0.0])) == "answer"
+    
+    def test_different_dimension_misses(self, cache):
+        """Test embeddings of another dimension miss instead of failing the similarity product"""
+        cache.set("tenant-a", np.array([1.0, 0.0, 0.0]), "answer")
+        
+        assert cache.get("tenant-a", np.array([1.0, 0.0])) is None
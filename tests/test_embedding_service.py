@@ -0,0 +1,47 @@
+"""
+Tests for embedding service
+"""
+import pytest
+import numpy as np
+from unittest.mock import patch
+from app.services.embedding_service import EmbeddingService
+
+
+@pytest.fixture
+def embedding_service():
+    """Create embedding service instance without loading a model"""
+    with patch.object(EmbeddingService, "_load_local_model"):
+        return EmbeddingService()
+
+
+class TestEmbeddingService:
+    """Test cases for EmbeddingService"""
+    
+    @pytest.mark.asyncio
+    async def test_embed_chunk_batch_keeps_float32_row_views(self, embedding_service):
+        """Test chunks share one float32 buffer tagged with the storage dtype"""
+        embedding_service.storage_dtype = np.dtype("float16")
+        chunks = [{"text": "first"}, {"text": "second"}]
+        
+        with patch.object(
+            EmbeddingService, "embed_text", return_value=np.array([[0.6, 0.8], [1.0, 0.0]])
+        ):
+            embeddings = await embedding_service.embed_chunk_batch(chunks)
+        
+        assert embeddings.dtype == np.float32
+        assert embeddings.shape == (2, 2)
+        assert np.shares_memory(chunks[0]["embedding"], embeddings)
+        assert chunks[0]["embedding_dtype"] == "float16"
+    
+    @pytest.mark.asyncio
+    async def test_embed_query_reuses_cached_embedding(self, embedding_service):
+        """Test repeated queries are embedded only once"""
+        with patch.object(
+            EmbeddingService, "embed_text", return_value=np.array([0.6, 0.8], dtype=np.float32)
+        ) as embed_text:
+            first = await embedding_service.embed_query("What is  the revenue? ")
+            second = await embedding_service.embed_query(" What is the revenue?")
+        
+        embed_text.assert_called_once_with("What is the revenue?", "local")
+        assert second is first
+        assert not first.flags.writeable
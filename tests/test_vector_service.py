@@ -0,0 +1,148 @@
+"""
+Tests for vector service
+"""
+import asyncio
+import pytest
+import numpy as np
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+from qdrant_client.http.models import Datatype, Distance
+from app.services import vector_service
+from app.services.vector_service import QdrantVectorService
+
+
+@pytest.fixture
+def qdrant_client():
+    """Mock Qdrant client whose collection has an indexing threshold of 20000 KB"""
+    client = AsyncMock()
+    client.get_collection.return_value = SimpleNamespace(
+        config=SimpleNamespace(optimizer_config=SimpleNamespace(indexing_threshold=20000))
+    )
+    with patch.object(vector_service, "_async_client", client):
+        yield client
+
+
+@pytest.fixture
+def thresholds(qdrant_client):
+    """Indexing thresholds set on the collection, in order"""
+    calls = []
+    
+    async def set_threshold(self, collection_name, threshold):
+        calls.append(threshold)
+    
+    with patch.object(QdrantVectorService, "_set_indexing_threshold", set_threshold):
+        yield calls
+
+
+class TestBulkUploads:
+    """Test cases for pausing indexing during bulk uploads"""
+    
+    @pytest.mark.asyncio
+    async def test_overlapping_bulk_uploads_share_one_pause(self, thresholds):
+        """Test indexing stays paused until the last overlapping upload ends"""
+        service = QdrantVectorService.__new__(QdrantVectorService)
+        
+        await asyncio.gather(
+            service._begin_bulk_upload("collection"),
+            service._begin_bulk_upload("collection")
+        )
+        await service._end_bulk_upload("collection")
+        
+        assert thresholds == [0]
+        
+        await service._end_bulk_upload("collection")
+        
+        assert thresholds == [0, 20000]
+        assert "collection" not in vector_service._bulk_uploads
+    
+    @pytest.mark.asyncio
+    async def test_unset_threshold_restores_configured_default(self, qdrant_client, thresholds):
+        """Test a collection without its own threshold gets the configured one back"""
+        qdrant_client.get_collection.return_value.config.optimizer_config.indexing_threshold = None
+        service = QdrantVectorService.__new__(QdrantVectorService)
+        
+        await service._begin_bulk_upload("collection")
+        await service._end_bulk_upload("collection")
+        
+        assert thresholds == [0, vector_service.settings.qdrant_indexing_threshold]
+
+
+class TestCollectionConfig:
+    """Test cases for checking an existing collection against the settings"""
+    
+    @pytest.fixture
+    def collection_info(self, qdrant_client):
+        """Collection config matching the defaults used for new collections"""
+        config = qdrant_client.get_collection.return_value.config
+        config.params = SimpleNamespace(
+            vectors=SimpleNamespace(
+                distance=Distance.DOT,
+                datatype=Datatype.FLOAT16,
+                on_disk=vector_service.settings.qdrant_on_disk
+            )
+        )
+        config.hnsw_config = SimpleNamespace(m=0, payload_m=16)
+        config.quantization_config = object() if vector_service.settings.qdrant_scalar_quantization else None
+        return config
+    
+    @pytest.mark.asyncio
+    async def test_matching_collection_is_not_flagged(self, collection_info, caplog):
+        """Test a collection created from the current settings logs no warning"""
+        service = QdrantVectorService.__new__(QdrantVectorService)
+        service.default_collection = "collection"
+        
+        with patch.object(vector_service.settings, "embedding_storage_dtype", "float16"):
+            await service._check_collection_config("collection")
+        
+        assert "does not match" not in caplog.text
+    
+    @pytest.mark.asyncio
+    async def test_warns_when_distance_and_datatype_differ(self, collection_info, caplog):
+        """Test an old COSINE float32 collection is flagged for recreation"""
+        collection_info.params.vectors.distance = Distance.COSINE
+        collection_info.params.vectors.datatype = None
+        service = QdrantVectorService.__new__(QdrantVectorService)
+        service.default_collection = "collection"
+        
+        with patch.object(vector_service.settings, "embedding_storage_dtype", "float16"):
+            await service._check_collection_config("collection")
+        
+        assert "distance Cosine != Dot" in caplog.text
+        assert "datatype float32 != float16" in caplog.text
+
+
+class TestSearchCache:
+    """Test cases for the tenant search cache"""
+    
+    @pytest.fixture
+    def generations(self):
+        """Redis stand-in holding search cache generations, shared like a real server"""
+        store = {}
+        client = AsyncMock()
+        client.get.side_effect = store.get
+        
+        async def incr(key):
+            store[key] = store.get(key, 0) + 1
+            return store[key]
+        
+        client.incr.side_effect = incr
+        with patch.object(vector_service, "_redis_client", client):
+            yield store
+    
+    @pytest.mark.asyncio
+    async def test_invalidation_reaches_other_workers(self, qdrant_client, generations):
+        """Test bumping the generation hides results cached before the change"""
+        qdrant_client.search.return_value = []
+        service = QdrantVectorService.__new__(QdrantVectorService)
+        service.default_collection = "collection"
+        query = np.array([0.6, 0.8], dtype=np.float32)
+        
+        await service.search_documents("tenant", query)
+        await service.search_documents("tenant", query)
+        assert qdrant_client.search.await_count == 1
+        
+        # Another worker changed the tenant's vectors; its local cache is not ours
+        generations["search_cache:generation:tenant"] = 1
+        await service.search_documents("tenant", query)
+        
+        assert qdrant_client.search.await_count == 2